@@ -0,0 +1,153 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+import multiprocessing
+
+AGENT_NAMES = ('seek', 'random')
+MAX_TICKS = 60 * 60 * 3  # give up on a run after three minutes of game time
+
+class SeekAgent:
+    # Heads for the nearest exit door, jumping when blocked and dashing now and then
+    def __init__(self, rng):
+        self.rng = rng
+    
+    def act(self, game):
+        player = game.player
+        exits = [d for d in game.doors if d['variant'] == 1]
+        right = True
+        if exits:
+            target = min(exits, key=lambda d: abs(d['pos'][0] - player.pos[0]) + abs(d['pos'][1] - player.pos[1]))
+            right = target['pos'][0] >= player.pos[0]
+        blocked = player.collisions['right'] if right else player.collisions['left']
+        # Jump at walls and before walking off a ledge
+        ahead = (player.rect().centerx + (12 if right else -12), player.rect().bottom + 4)
+        jump = blocked or not game.tilemap.solid_check(ahead) or self.rng.random() < 0.02
+        dash = self.rng.random() < 0.01
+        return (not right, right), jump, dash
+
+class RandomAgent:
+    # Holds random inputs for random stretches of time
+    def __init__(self, rng):
+        self.rng = rng
+        self.inputs = ((False, False), False, False)
+        self.hold = 0
+    
+    def act(self, game):
+        if self.hold <= 0:
+            self.hold = self.rng.randint(10, 60)
+            direction = self.rng.choice(((True, False), (False, True), (False, True), (False, False)))
+            self.inputs = (direction, self.rng.random() < 0.3, self.rng.random() < 0.05)
+        self.hold -= 1
+        movement, jump, dash = self.inputs
+        self.inputs = (movement, False, False)  # presses only last one tick
+        return movement, jump, dash
+
+AGENTS = {'seek': SeekAgent, 'random': RandomAgent}
+
+def run_seed(base_seed, map_id, agent, run):
+    # Depends only on the task, so results do not change with the number of workers
+    return random.Random(f'{base_seed}:{map_id}:{agent}:{run}').randrange(2**32)
+
+game = None
+
+def run_episode(task):
+    # One headless run of a map; each worker process keeps a single game and restarts it
+    global game
+    map_id, agent, run, seed, max_ticks = task
+    from jumper import JumperGame
+    if game is None:
+        game = JumperGame(headless=True, seed=seed)
+    start = time.perf_counter()
+    game.restart(seed, level=map_id)
+    # Keep the level's own coin and enemy collections; they stay valid after a door or game over swaps in new ones
+    coins, enemies = game.coins, game.enemies
+    coins_total, enemies_total = len(coins), len(enemies)
+    player = AGENTS[agent](random.Random(str(seed) + ':agent'))
+    
+    outcome = 'timeout'
+    lives_lost = 0
+    ticks = 0
+    while ticks < max_ticks:
+        lives, score = game.lives, game.score
+        game.step(*player.act(game))
+        ticks += 1
+        if game.lives > lives:
+            # The game has already reset itself, so report the score it had
+            outcome = 'game_over'
+            lives_lost += lives
+            break
+        lives_lost += lives - game.lives
+        if game.level != map_id or game.complete:
+            outcome = 'exit'
+            break
+    
+    return {
+        'map': map_id, 'agent': agent, 'run': run, 'seed': seed, 'outcome': outcome, 'ticks': ticks,
+        'score': score if outcome == 'game_over' else game.score, 'coins': coins_total - len(coins), 'coins_total': coins_total,
+        'enemies_killed': enemies_total - len(enemies), 'enemies_total': enemies_total,
+        'lives_lost': lives_lost, 'wall_ms': round((time.perf_counter() - start) * 1000, 2),
+    }
+
+def map_ids():
+    ids = set()
+    for name in os.listdir('data/maps'):
+        stem, ext = os.path.splitext(name)
+        if ext in ('.json', '.bjm') and stem.isdigit():
+            ids.add(int(stem))
+    return sorted(ids)
+
+def summarize(results):
+    # Aggregate statistics per (map, agent)
+    groups = {}
+    for result in results:
+        groups.setdefault((result['map'], result['agent']), []).append(result)
+    rows = []
+    for (map_id, agent), group in sorted(groups.items()):
+        scores = [r['score'] for r in group]
+        exits = [r for r in group if r['outcome'] == 'exit']
+        rows.append({
+            'map': map_id, 'agent': agent, 'runs': len(group),
+            'completion': len(exits) / len(group),
+            'score_mean': statistics.fmean(scores), 'score_median': statistics.median(scores), 'score_max': max(scores),
+            'coins_max': max(r['coins'] for r in group), 'coins_total': group[0]['coins_total'],
+            'exit_ticks_median': statistics.median(r['ticks'] for r in exits) if exits else None,
+            'game_overs': sum(r['outcome'] == 'game_over' for r in group),
+            'timeouts': sum(r['outcome'] == 'timeout' for r in group),
+        })
+    return rows
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run many headless games per map over a process pool')
+    parser.add_argument('--maps', type=int, nargs='+', help='map ids to run (default: every map in data/maps)')
+    parser.add_argument('--agents', nargs='+', choices=AGENT_NAMES, default=list(AGENT_NAMES), help='input agents to run on each map')
+    parser.add_argument('--runs', type=int, default=100, help='runs per map and agent')
+    parser.add_argument('--seed', type=int, default=0, help='base seed; every run derives its own seed from it')
+    parser.add_argument('--ticks', type=int, default=MAX_TICKS, help='tick limit per run')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help='worker processes')
+    parser.add_argument('--out', default='batch_results.jsonl', metavar='PATH', help='JSON Lines file for per-run results')
+    args = parser.parse_args()
+    
+    tasks = [(map_id, agent, run, run_seed(args.seed, map_id, agent, run), args.ticks)
+             for map_id in (args.maps or map_ids()) for agent in args.agents for run in range(args.runs)]
+    results = []
+    start = time.perf_counter()
+    with open(args.out, 'w') as f, multiprocessing.Pool(args.jobs) as pool:
+        for result in pool.imap_unordered(run_episode, tasks, chunksize=max(1, len(tasks) // (args.jobs * 8))):
+            f.write(json.dumps(result) + '\n')
+            f.flush()
+            results.append(result)
+            print(f'\r{len(results)}/{len(tasks)} runs', end='', file=sys.stderr)
+    elapsed = time.perf_counter() - start
+    ticks = sum(r['ticks'] for r in results)
+    print(f'\r{len(results)} runs, {ticks} ticks in {elapsed:.1f}s ({ticks/max(elapsed, 1e-9):.0f} ticks/s) on {args.jobs} workers', file=sys.stderr)
+    
+    for row in summarize(results):
+        exit_ticks = '-' if row['exit_ticks_median'] is None else f"{row['exit_ticks_median']:.0f}"
+        print(f"map {row['map']} {row['agent']:>6}: {row['runs']} runs, {row['completion']:.0%} completed (median {exit_ticks} ticks), "
+              f"score mean {row['score_mean']:.0f} / median {row['score_median']:.0f} / max {row['score_max']}, "
+              f"up to {row['coins_max']}/{row['coins_total']} coins, "
+              f"{row['game_overs']} game overs, {row['timeouts']} timeouts")
\ No newline at end of file
@@ -0,0 +1,92 @@
+import sys
+import random
+import argparse
+import timeit
+import tracemalloc
+import pygame
+
+from scripts.tilemap import WorldMap, NEIGHBOR_OFFSETS, PHYSICS_TILES
+
+class StringKeyedMap:
+    # The original tile lookups, keyed by "x;y" strings, kept as the baseline to measure against
+    def __init__(self, tiles, tile_size=16):
+        self.tile_size = tile_size
+        self.tilemap = {str(loc[0]) + ';' + str(loc[1]): tile for loc, tile in tiles.items()}
+    
+    def tiles_around(self, pos):
+        found = []
+        tloc = (int(pos[0] // self.tile_size), int(pos[1] // self.tile_size))
+        for off in NEIGHBOR_OFFSETS:
+            check_loc = str(tloc[0] + off[0]) + ';' + str(tloc[1] + off[1])
+            if check_loc in self.tilemap:
+                found.append(self.tilemap[check_loc])
+        return found
+    
+    def solid_check(self, pos):
+        tile_loc = str(int(pos[0] // self.tile_size)) + ';' + str(int(pos[1] // self.tile_size))
+        if tile_loc in self.tilemap:
+            if self.tilemap[tile_loc]['type'] in PHYSICS_TILES:
+                return self.tilemap[tile_loc]
+    
+    def physics_rects_around(self, pos):
+        rects = []
+        for t in self.tiles_around(pos):
+            if t['type'] in PHYSICS_TILES:
+                rects.append(pygame.Rect(t['pos'][0]*self.tile_size, t['pos'][1]*self.tile_size, self.tile_size, self.tile_size))
+        return rects
+
+def make_tiles(width, rng):
+    # A level-like strip: rolling ground with floating platforms and some decor on top
+    tiles = {}
+    height = 24
+    for x in range(width):
+        ground = 16 + int(4 * abs((x % 64) - 32) / 32)
+        for y in range(ground, height):
+            tiles[(x, y)] = {'type': 'stone' if y > ground + 1 else 'grass', 'variant': 0, 'pos': [x, y]}
+        if rng.random() < 0.1:
+            tiles[(x, ground - 1)] = {'type': 'decor', 'variant': 0, 'pos': [x, ground - 1]}
+        if x % 12 < 4:
+            tiles[(x, 9)] = {'type': 'grass', 'variant': 0, 'pos': [x, 9]}
+    return tiles
+
+def measure(fns, points, repeat):
+    # Best per-call time in ns and bytes per call still held when every result is kept, for each
+    # function; runs are interleaved so load on the machine hits all of them alike
+    best = [float('inf')] * len(fns)
+    for r in range(repeat):
+        for i, fn in enumerate(fns):
+            best[i] = min(best[i], timeit.timeit(lambda: [fn(p) for p in points], number=1))
+    held = []
+    for fn in fns:
+        kept = [None] * len(points)
+        tracemalloc.start()
+        for i, p in enumerate(points):
+            kept[i] = fn(p)
+        held.append(tracemalloc.get_traced_memory()[0] / len(points))
+        tracemalloc.stop()
+    return [t / len(points) * 1e9 for t in best], held
+
+if __name__ == '__main__':
+    # Tile lookup microbenchmark: python bench.py [--sizes 64 256 1024] compares WorldMap with the
+    # original string-keyed lookups on generated maps of each width, over the queries entities make per tick
+    parser = argparse.ArgumentParser(description='Tile lookup microbenchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[64, 256, 1024, 4096], help='map widths in tiles')
+    parser.add_argument('--queries', type=int, default=20000, help='lookups per measurement')
+    parser.add_argument('--repeat', type=int, default=9, help='best of this many runs')
+    args = parser.parse_args()
+    
+    print('%6s %-22s %8s %8s %7s %10s %10s' % ('width', 'query', 'old ns', 'new ns', 'speedup', 'old B/call', 'new B/call'))
+    for width in args.sizes:
+        rng = random.Random(width)
+        tiles = make_tiles(width, rng)
+        old = StringKeyedMap(tiles)
+        new = WorldMap(None)
+        new.tilemap = {loc: dict(tile) for loc, tile in tiles.items()}
+        new.reindex()
+        new.build_solidity()
+        # Entities spend their time near the ground, so that is where the queries go
+        points = [(rng.random() * width * 16, rng.uniform(8, 23) * 16) for i in range(args.queries)]
+        for query in ('physics_rects_around', 'solid_check', 'tiles_around'):
+            (old_ns, new_ns), (old_bytes, new_bytes) = measure([getattr(old, query), getattr(new, query)], points, args.repeat)
+            print('%6d %-22s %8.0f %8.0f %6.1fx %10.1f %10.1f' % (width, query, old_ns, new_ns, old_ns / new_ns, old_bytes, new_bytes))
+    sys.exit(0)
\ No newline at end of file
@@ -1,17 +1,22 @@
 import sys
+import argparse
 import pygame
 
-from scripts.utils import fetch_images
+from scripts.utils import fetch_images, image_cache
 from scripts.tilemap import WorldMap
+from scripts.edits import EditHistory, rect_locs, flood_locs
 
-RENDER_SCALE = 2.0
+RENDER_SCALE = 2
 
 class WorldEditor:
-    def __init__(self):
+    def __init__(self, scale=RENDER_SCALE):
         pygame.init()
         pygame.display.set_caption('editor')
-        self.screen = pygame.display.set_mode((640, 480))
+        self.scale = scale
+        self.screen = pygame.display.set_mode((320 * scale, 240 * scale))
         self.display = pygame.Surface((320, 240))
+        # Scaled into every frame rather than allocated
+        self.scaled = pygame.Surface(self.screen.get_size(), 0, self.display)
         self.clock = pygame.time.Clock()
         
         # Load assets
@@ -21,9 +26,10 @@ class WorldEditor:
             'large_decor': fetch_images('tiles/large_decor'),
             'stone': fetch_images('tiles/stone'),
             'spawners': fetch_images('tiles/spawners'),
-            'doors': [pygame.transform.scale(img, (16, 20)) for img in fetch_images('tiles/door')],
+            'doors': fetch_images('tiles/door', size=(16, 20)),
             'coin': fetch_images('tiles/coin'),
         }
+        image_cache.save()
         
         self.movement = [False, False, False, False]
         
@@ -34,6 +40,7 @@ class WorldEditor:
             self.tilemap.load('map.json')
         except FileNotFoundError:
             pass
+        self.history = EditHistory(self.tilemap)
         
         self.scroll = [0, 0]
         
@@ -46,6 +53,35 @@ class WorldEditor:
         self.shift = False
         self.ongrid = True
         
+        # With auto-tiling on, each brush stroke re-autotiles just the tiles it touched
+        self.auto_tile = False
+        self.dirty = set()
+    
+        # B, R and F pick the brush, rectangle and flood fill tools
+        self.tool = 'brush'
+        self.drag_start = None
+        self.last_paint = None
+        self.ghosts = {}
+    
+    def ghost(self, tile_type, variant):
+        # Translucent preview of the selected tile, made once per variant
+        if (tile_type, variant) not in self.ghosts:
+            img = self.assets[tile_type][variant].copy()
+            img.set_alpha(100)
+            self.ghosts[(tile_type, variant)] = img
+        return self.ghosts[(tile_type, variant)]
+    
+    def new_tile(self, loc):
+        return {'type': self.tile_list[self.tile_group], 'variant': self.tile_variant, 'pos': loc}
+    
+    def fill(self, start, erase=False):
+        # Flood the connected region under the cursor, staying inside the map's current extent
+        bounds = self.tilemap.bounds() or (start[0], start[1], start[0], start[1])
+        bounds = (min(bounds[0], start[0]), min(bounds[1], start[1]), max(bounds[2], start[0]), max(bounds[3], start[1]))
+        locs = flood_locs(self.tilemap, start, bounds)
+        self.history.set_tiles({loc: None if erase else self.new_tile(loc) for loc in locs})
+        self.dirty.update(locs)
+    
     def run(self):
         while True:
             self.display.fill((0, 0, 0))
@@ -57,11 +93,10 @@ class WorldEditor:
             
             self.tilemap.render(self.display, offset=r_scroll)
             
-            c_tile_img = self.assets[self.tile_list[self.tile_group]][self.tile_variant].copy()
-            c_tile_img.set_alpha(100)
+            c_tile_img = self.ghost(self.tile_list[self.tile_group], self.tile_variant)
             
             mpos = pygame.mouse.get_pos()
-            mpos = (mpos[0]/RENDER_SCALE, mpos[1]/RENDER_SCALE)
+            mpos = (mpos[0]/self.scale, mpos[1]/self.scale)
             tile_pos = (int((mpos[0]+self.scroll[0])//self.tilemap.tile_size), int((mpos[1]+self.scroll[1])//self.tilemap.tile_size))
             
             if self.ongrid:
@@ -69,17 +104,27 @@ class WorldEditor:
             else:
                 self.display.blit(c_tile_img, mpos)
             
-            if self.clicking and self.ongrid:
-                self.tilemap.tilemap[str(tile_pos[0])+';'+str(tile_pos[1])] = {'type': self.tile_list[self.tile_group], 'variant': self.tile_variant, 'pos': tile_pos}
-            if self.right_clicking:
-                tile_loc = str(tile_pos[0])+';'+str(tile_pos[1])
-                if tile_loc in self.tilemap.tilemap:
-                    del self.tilemap.tilemap[tile_loc]
-                for t in self.tilemap.offgrid_tiles.copy():
-                    timg = self.assets[t['type']][t['variant']]
-                    tr = pygame.Rect(t['pos'][0]-self.scroll[0], t['pos'][1]-self.scroll[1], timg.get_width(), timg.get_height())
-                    if tr.collidepoint(mpos):
-                        self.tilemap.offgrid_tiles.remove(t)
+            # Outline of the rectangle being dragged
+            if self.drag_start is not None:
+                x0, y0 = min(self.drag_start[0], tile_pos[0]), min(self.drag_start[1], tile_pos[1])
+                x1, y1 = max(self.drag_start[0], tile_pos[0]), max(self.drag_start[1], tile_pos[1])
+                ts = self.tilemap.tile_size
+                pygame.draw.rect(self.display, (255, 80, 80) if self.right_clicking else (255, 255, 255), (x0*ts - r_scroll[0], y0*ts - r_scroll[1], (x1-x0+1)*ts, (y1-y0+1)*ts), 1)
+            
+            # The brush only writes when the cursor reaches another tile
+            if self.tool == 'brush':
+                paint = (tile_pos, self.tile_group, self.tile_variant, self.clicking and self.ongrid, self.right_clicking)
+                if paint != self.last_paint:
+                    if self.clicking and self.ongrid:
+                        self.history.set_tiles({tile_pos: self.new_tile(tile_pos)})
+                        self.dirty.add(tile_pos)
+                    if self.right_clicking:
+                        self.history.set_tiles({tile_pos: None})
+                        self.dirty.add(tile_pos)
+                    self.last_paint = paint
+                if self.right_clicking:
+                    for t in self.tilemap.offgrid_in(pygame.Rect(int(mpos[0]+self.scroll[0]), int(mpos[1]+self.scroll[1]), 1, 1)):
+                        self.history.remove_offgrid(t)
             
             self.display.blit(c_tile_img, (5, 5))
             
@@ -92,9 +137,15 @@ class WorldEditor:
                     if event.button == 1:
                         self.clicking = True
                         if not self.ongrid:
-                            self.tilemap.offgrid_tiles.append({'type': self.tile_list[self.tile_group], 'variant': self.tile_variant, 'pos': (mpos[0]+self.scroll[0], mpos[1]+self.scroll[1])})
+                            self.history.add_offgrid({'type': self.tile_list[self.tile_group], 'variant': self.tile_variant, 'pos': (mpos[0]+self.scroll[0], mpos[1]+self.scroll[1])})
+                        elif self.tool == 'fill':
+                            self.fill(tile_pos)
                     if event.button == 3:
                         self.right_clicking = True
+                        if self.tool == 'fill':
+                            self.fill(tile_pos, erase=True)
+                    if event.button in (1, 3) and self.tool == 'rect' and (self.ongrid or event.button == 3):
+                        self.drag_start = tile_pos
                     if self.shift:
                         if event.button == 4:
                             self.tile_variant = (self.tile_variant - 1) % len(self.assets[self.tile_list[self.tile_group]])
@@ -108,12 +159,33 @@ class WorldEditor:
                             self.tile_group = (self.tile_group + 1) % len(self.tile_list)
                             self.tile_variant = 0
                 if event.type == pygame.MOUSEBUTTONUP:
+                    if event.button in (1, 3) and self.drag_start is not None:
+                        locs = rect_locs(self.drag_start, tile_pos)
+                        self.history.set_tiles({loc: None if event.button == 3 else self.new_tile(loc) for loc in locs})
+                        self.dirty.update(locs)
+                        self.drag_start = None
                     if event.button == 1:
                         self.clicking = False
                     if event.button == 3:
                         self.right_clicking = False
+                    if not (self.clicking or self.right_clicking):
+                        # The stroke is over: fix up the tiles it touched and make it one undo step
+                        if self.auto_tile and self.dirty:
+                            self.history.begin()
+                            self.history.record(self.tilemap.autotile(self.dirty))
+                        self.dirty = set()
+                        self.last_paint = None
+                        self.history.end()
                         
                 if event.type == pygame.KEYDOWN:
+                    if event.mod & pygame.KMOD_CTRL and event.key in (pygame.K_z, pygame.K_y):
+                        # Ctrl+Z undoes the last stroke, Ctrl+Shift+Z or Ctrl+Y redoes it; other keys
+                        # still count while Ctrl is held, so Shift and movement never get stuck
+                        if event.key == pygame.K_y or event.mod & pygame.KMOD_SHIFT:
+                            self.history.redo()
+                        else:
+                            self.history.undo()
+                        continue
                     if event.key == pygame.K_a:
                         self.movement[0] = True
                     if event.key == pygame.K_d:
@@ -125,7 +197,17 @@ class WorldEditor:
                     if event.key == pygame.K_g:
                         self.ongrid = not self.ongrid
                     if event.key == pygame.K_t:
-                        self.tilemap.autotile()
+                        self.history.begin()
+                        self.history.record(self.tilemap.autotile())
+                        self.history.end()
+                    if event.key == pygame.K_y:
+                        self.auto_tile = not self.auto_tile
+                    if event.key == pygame.K_b:
+                        self.tool = 'brush'
+                    if event.key == pygame.K_r:
+                        self.tool = 'rect'
+                    if event.key == pygame.K_f:
+                        self.tool = 'fill'
                     if event.key == pygame.K_o:
                         self.tilemap.save('map.json')
                     if event.key == pygame.K_LSHIFT:
@@ -142,8 +224,11 @@ class WorldEditor:
                     if event.key == pygame.K_LSHIFT:
                         self.shift = False
             
-            self.screen.blit(pygame.transform.scale(self.display, self.screen.get_size()), (0, 0))
+            pygame.transform.scale(self.display, self.scaled.get_size(), self.scaled)
+            self.screen.blit(self.scaled, (0, 0))
             pygame.display.update()
             self.clock.tick(60)
 
-WorldEditor().run()
\ No newline at end of file
+parser = argparse.ArgumentParser(description='Level editor for map.json')
+parser.add_argument('--scale', type=int, default=RENDER_SCALE, help='window size as a multiple of the 320x240 view')
+WorldEditor(scale=parser.parse_args().scale).run()
\ No newline at end of file
@@ -1,27 +1,66 @@
+import time
+STARTED = time.perf_counter()  # before the heavy imports, so startup reports include them
+
 import sys
 import math
 import random
+import argparse
+import hashlib
 import pygame
 import json
+import threading
 
-from scripts.utils import fetch_image, fetch_images, FrameAnimation
-from scripts.entities import Hero, Foe
-from scripts.tilemap import WorldMap
+from scripts.utils import fetch_image, fetch_images, image_cache, FrameAnimation, make_rngs
+from scripts.entities import Hero
+from scripts.levels import LevelLoader
 from scripts.clouds import SkyClouds
-from scripts.particle import VFXParticle
-from scripts.spark import Ember
+from scripts.particle import ParticleSystem
+from scripts.spark import SparkSystem
+from scripts.render import RenderQueue, iris_masks
+from scripts.outline import OutlineLayer, OUTLINE_QUALITIES
+from scripts.storage import SaveFile
+from scripts.profiler import FrameProfiler, StartupTimer
+from scripts.hud import HUD
+from scripts.audio import SoundManager
+
+FPS = 60
+TICK_MS = 1000 / FPS
+MAX_STEPS_PER_FRAME = 5  # drop simulation time instead of spiralling when far behind
+WAKE_MARGIN = 160  # px around the camera view in which enemies keep simulating
+WINDOW_SCALE = 2  # window pixels per game pixel
+HUD_FONT = ('arial', 12)
 
 class JumperGame:
-    def __init__(self):
-        pygame.init()
-        self.game_time = 0
-        pygame.display.set_caption('Block Jumper Adventure')
-        self.screen = pygame.display.set_mode((640, 480))
+    def __init__(self, headless=False, seed=None, recorder=None, outline='sprites', profile=None, wake_margin=WAKE_MARGIN, scale=WINDOW_SCALE, measure_startup=False):
+        # Headless games never touch pygame.display or the mixer
+        self.headless = headless
+        self.recorder = recorder
+        # Enemies further than this from the view sleep until the camera comes close; None keeps all awake
+        self.wake_margin = wake_margin
+        # Windowed games show a first frame as soon as the images are in; level 0 is built meanwhile
+        # and sounds and the system font arrive from a worker thread after it
+        self.startup = StartupTimer(STARTED)
+        self.measure_startup = measure_startup
+        self.first_game_frame = False  # set once run() has presented its first frame
+        self.startup.mark('imports')
+        if not headless:
+            pygame.init()
+            pygame.display.set_caption('Block Jumper Adventure')
+            self.screen = pygame.display.set_mode((320 * scale, 240 * scale))
+            self.clock = pygame.time.Clock()
         self.display = pygame.Surface((320, 240), pygame.SRCALPHA)
         self.display_2 = pygame.Surface((320, 240))
-        self.clock = pygame.time.Clock()
-        
-        self.movement = [False, False]
+        if not headless:
+            # The present step scales into this every frame instead of allocating a new surface
+            self.scaled = pygame.Surface(self.screen.get_size(), 0, self.display_2)
+            self.iris = iris_masks(self.display.get_size())
+        self.render_queue = RenderQueue()
+        self.outline_quality = outline
+        self.outlines = OutlineLayer(self.display_2)
+        self.profiler = FrameProfiler()
+        self.profiler.enabled = bool(profile)
+        self.profile_path = profile
+        self.startup.mark('display')
         
         # Load game assets
         self.assets = {
@@ -43,231 +82,404 @@ class JumperGame:
             'particle/particle': FrameAnimation(fetch_images('particles/particle'), img_dur=6, loop=False),
             'gun': fetch_image('gun.png'),
             'projectile': fetch_image('projectile.png'),
-            'doors': [pygame.transform.scale(i, (16, 20)) for i in fetch_images('tiles/door')],
+            'doors': fetch_images('tiles/door', size=(16, 20)),
             'coin': fetch_images('tiles/coin'),
-            'heart': pygame.transform.scale(pygame.image.load('data/images/tiles/heart/0.png').convert_alpha(), (16,16))
+            'heart': fetch_image('tiles/heart/0.png', alpha=True, size=(16, 16))
         }
+        image_cache.save()
+        self.assets['gun/flipped'] = pygame.transform.flip(self.assets['gun'], True, False)
+        self.startup.mark('images')
         
-        # Sound effects
-        self.sfx = {
-            'jump': pygame.mixer.Sound('data/sfx/jump.wav'),
-            'dash': pygame.mixer.Sound('data/sfx/dash.wav'),
-            'hit': pygame.mixer.Sound('data/sfx/hit.wav'),
-            'shoot': pygame.mixer.Sound('data/sfx/shoot.wav'),
-            'ambience': pygame.mixer.Sound('data/sfx/ambience.wav'),
-            'coin': pygame.mixer.Sound('data/sfx/coin.wav')
-        }
+        # Sound effects, mixed once per frame with voice caps and priorities; headless games stay silent.
+        # Until the loader thread has decoded them, sounds are silent placeholders
+        self.sfx = SoundManager(enabled=not headless, load_now=False)
         
-        self.sfx['ambience'].set_volume(0.2)
-        self.sfx['shoot'].set_volume(0.4)
-        self.sfx['hit'].set_volume(0.8)
-        self.sfx['dash'].set_volume(0.3)
-        self.sfx['jump'].set_volume(0.7)
-        self.sfx['coin'].set_volume(0.2)
+        self.particles = ParticleSystem({'leaf': self.assets['particle/leaf'], 'particle': self.assets['particle/particle']})
+        self.sparks = SparkSystem()
         
-        self.clouds = SkyClouds(self.assets['clouds'], count=16)
+        # Levels are built on a worker thread; windowed games also pre-bake the first view
+        self.levels = LevelLoader(self, view_size=None if headless else self.display.get_size())
+        self.tilemap = None
         
-        self.player = Hero(self, (50, 50), (8, 15))
-        self.tilemap = WorldMap(self, tile_size=16)
+        # Headless runs never touch the player's save file
+        self.save_data = SaveFile(None if headless else 'highscore.json')
+        self.high_score = self.save_data.get('high_score', 0)
         
-        self.level = 0
-        self.score = 0
-        self.lives = 3
-        self.high_score = self.load_high_score()
-        self.load_level(self.level)
+        self.loader = None
+        if not headless:
+            # Level 0 never touches the seeded streams, so it can be built while the sky is on screen
+            self.game_time = 0
+            self.levels.preload(0)
+            self.display_2.blit(self.assets['background'], (0, 0))
+            self.present()
+            self.startup.mark('first frame')
+            self.font_path = None
+            self.loader = threading.Thread(target=self.load_deferred, daemon=True)
+            self.loader.start()
         
-        self.font = pygame.font.SysFont('Arial', 12) 
+        self.restart(seed)
+        self.startup.mark('level')
         
-        self.screenshake = 0
-        self.dead = 0
-        self.transition = -30
+        if not headless:
+            # pygame's built-in font stands in until the system font has been found
+            self.font = pygame.font.Font(None, HUD_FONT[1])
+            self.hud = HUD(self.font, self.assets['heart'])
+            self.win_text = None  # (score and font it was made for, shadow, text)
+            self.startup.mark('hud')
+    
+    def load_deferred(self):
+        # Worker thread: decode the sounds, then look up the system font, which can mean scanning
+        # every installed font. Fonts are only created and drawn on the main thread
+        self.sfx.load()
+        self.startup.event('sounds')
+        self.font_path = pygame.font.match_font(HUD_FONT[0])
+        self.startup.event('font lookup')
+    
+    def finish_deferred(self):
+        # Main thread side of load_deferred, checked once per frame until the worker is done
+        if self.loader is None or self.loader.is_alive():
+            return
+        self.loader = None
+        self.font = pygame.font.Font(self.font_path, HUD_FONT[1])
+        self.hud.set_font(self.font)
+        self.sfx.stream_music()
+        self.startup.event('ready')
+        if self.measure_startup:
+            print(self.startup.report())
+            pygame.event.post(pygame.event.Event(pygame.QUIT))
         
-    def load_high_score(self):
-        # Load high score from file
-        try:
-            with open('highscore.json', 'r') as f:
-                data = json.load(f)
-                return data.get('high_score', 0)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return 0
+    def restart(self, seed=None, level=0):
+        # Begin a fresh seeded run on an already loaded game (batch workers reuse one game per process)
+        self.seed = random.randrange(2**32) if seed is None else seed
+        self.rng = make_rngs(self.seed)
+        self.game_time = 0
+        self.movement = [False, False]
+        self.jump_queued = False
+        self.dash_queued = False
+        self.screenshake = 0
         
-    def save_high_score(self):
-        # Save high score
-        with open('highscore.json', 'w') as f:
-            json.dump({'high_score': self.high_score}, f)
+        self.clouds = SkyClouds(self.assets['clouds'], count=16, rng=self.rng['clouds'])
+        self.player = Hero(self, (50, 50), (8, 15))
         
+        self.level = level
+        self.score = 0
+        self.lives = 3
+        self.complete = 0
+        if not self.load_level(self.level):
+            raise FileNotFoundError('no map for level ' + str(self.level))
+    
     def load_level(self, map_id):
-        self.tilemap.load('data/maps/' + str(map_id) + '.json')
+        # Swap in a prepared level; returns False when there is no map for map_id
+        level = self.levels.take(map_id)
+        if not level:
+            return False
+        if self.tilemap:
+            self.tilemap.close_map_file()
         
-        self.leaf_spawners = []
-        for tree in self.tilemap.extract([('large_decor', 2)], keep=True):
-            self.leaf_spawners.append(pygame.Rect(4+tree['pos'][0],4+tree['pos'][1],23,13))
-            
-        self.enemies = []
-        for sp in self.tilemap.extract([('spawners', 1)]):  # enemy spawners
-            self.enemies.append(Foe(self, sp['pos'], (8,15)))
-            
-        self.doors = self.tilemap.extract([('doors',0),('doors',1)])
-        for d in self.doors:
-            if d['variant'] == 0:
-                self.player.pos = list(d['pos'])
-                self.player.air_time = 0
-                break
+        self.tilemap = level.tilemap
+        self.leaf_spawners = level.leaf_spawners
+        self.enemies = level.enemies
+        self.doors = level.doors
+        self.enemy_grid = level.enemy_grid
+        self.door_grid = level.door_grid
+        self.coin_grid = level.coin_grid
+        if level.spawn:
+            self.player.pos = list(level.spawn)
+            self.player.air_time = 0
         
-        self.coins = self.tilemap.extract([('coin',0)], keep=False)
+        self.coins = level.coins
         self.projectiles = []
-        self.particles = []
-        self.sparks = []
+        self.particles.clear()
+        self.sparks.clear()
         
         self.scroll = [0, 0]
         self.dead = 0
         self.transition = -30
-
+    
+        # Start building the next level while this one is played
+        self.levels.preload(map_id + 1)
+        return True
+    
     def reset_game(self):
         self.level = 0
         self.score = 0
         self.lives = 3
+        self.complete = 0
         self.load_level(self.level)
-
-    def run(self):
-        pygame.mixer.music.load('data/music.wav')
-        pygame.mixer.music.set_volume(0.5)
-        pygame.mixer.music.play(-1)
-        self.sfx['ambience'].play(-1)
+    
+    def step(self, movement=None, jump=False, dash=False):
+        # Advance the world by one fixed tick; nothing here draws or reads the display
+        if movement is not None:
+            self.movement = list(movement)
+        jump = jump or self.jump_queued
+        dash = dash or self.dash_queued
+        self.jump_queued = False
+        self.dash_queued = False
+        if self.recorder is not None:
+            self.recorder.record(self.movement, jump, dash)
         
-        while True:
-            self.game_time += 1
-            self.display.fill((0,0,0,0))
-            self.display_2.blit(self.assets['background'], (0,0))
-            
-            self.screenshake = max(0, self.screenshake - 1)
-            
-            if self.transition < 0:
-                self.transition += 1
-            
-            if self.dead:
+        self.game_time += 1
+        self.screenshake = max(0, self.screenshake - 1)
+        
+        # Past the last door the transition closes instead of opening
+        if self.complete:
+            self.transition = min(30, self.transition + 1)
+        elif self.transition < 0:
+            self.transition += 1
+        
+        if self.dead:
+            self.dead += 1
+            if self.dead >= 10:
+                self.transition = min(30, self.transition + 1)
+            if self.dead > 40:
+                self.lives -= 1
+                if self.lives <= 0:
+                    self.reset_game()
+                else:
+                    for d in self.doors:
+                        if d['variant'] == 0:
+                            self.player.pos = list(d['pos'])
+                            self.player.velocity = [0,0]
+                            self.player.air_time = 0
+                            break
+                self.dead = 0
+                self.transition = -30
+        
+        # Past the last door: show the ending, then start over
+        if self.complete:
+            self.complete += 1
+            if self.complete > 120:
+                self.reset_game()
+        
+        if jump and self.player.jump():
+            self.sfx.play('jump')
+        if dash:
+            self.player.dash()
+        
+        prof = self.profiler
+        self.scroll[0] += (self.player.rect().centerx - self.display.get_width()/2 - self.scroll[0])/30
+        self.scroll[1] += (self.player.rect().centery - self.display.get_height()/2 - self.scroll[1])/30
+        
+        # Leaf spawn
+        for rect in self.leaf_spawners:
+            if self.rng['leaves'].random()*49999 < rect.width*rect.height:
+                ps = (rect.x+self.rng['leaves'].random()*rect.width, rect.y+self.rng['leaves'].random()*rect.height)
+                self.particles.emit('leaf', ps, velocity=[-0.1,0.3], frame=self.rng['leaves'].randint(0,20))
+        
+        self.clouds.update()
+        prof.mark('sim/world')
+        
+        # Coins, bobbing up to 2px around the position they were hashed at
+        vertical_offset = math.sin(self.game_time*0.05)*2
+        player_rect = self.player.rect()
+        for c in self.coin_grid.query(player_rect.inflate(0, 6)):
+            c_rect = pygame.Rect(c['pos'][0], c['pos'][1]+vertical_offset, self.tilemap.tile_size, self.tilemap.tile_size)
+            if player_rect.colliderect(c_rect):
+                del self.coins[id(c)]
+                self.coin_grid.remove(c)
+                self.score += 50
+                self.sfx.play('coin', c['pos'])
+        prof.mark('sim/coins')
+        
+        # Enemies, frozen along with their projectiles once the ending is showing
+        if self.complete:
+            active = []
+        elif self.wake_margin is None:
+            active = self.enemies.copy()
+        else:
+            view = pygame.Rect(int(self.scroll[0]), int(self.scroll[1]), self.display.get_width(), self.display.get_height())
+            awake = {id(foe) for foe in self.enemy_grid.query(view.inflate(self.wake_margin*2, self.wake_margin*2))}
+            active = [foe for foe in self.enemies if id(foe) in awake]
+        prof.count('awake enemies', len(active))
+        for foe in active:
+            kill = foe.update(self.tilemap, (0,0))
+            if kill:
+                self.enemies.remove(foe)
+                self.enemy_grid.remove(foe)
+                self.score += 100
+                self.screenshake = max(16, self.screenshake)
+                self.sfx.play('hit')
+            else:
+                self.enemy_grid.move(foe, foe.rect())
+        prof.mark('sim/enemies')
+        
+        # Player
+        if not self.dead and not self.complete:
+            self.player.update(self.tilemap, (self.movement[1]-self.movement[0],0))
+        prof.mark('sim/player')
+        
+        # Check level transition
+        player_rect = self.player.rect()
+        for d in self.door_grid.query(player_rect):
+            if d['variant'] == 1 and not self.complete:
+                if self.load_level(self.level + 1):
+                    self.level += 1
+                else:
+                    self.complete = 1
+                break
+        
+        # Projectiles, which stop with the enemies
+        for projectile in ([] if self.complete else self.projectiles.copy()):
+            projectile[0][0] += projectile[1]
+            projectile[2] += 1
+            if self.tilemap.solid_check(projectile[0]):
+                self.projectiles.remove(projectile)
+                for i in range(4):
+                    self.sparks.emit(projectile[0], self.rng['fx'].random()-0.5+(math.pi if projectile[1]>0 else 0), 2+self.rng['fx'].random())
+            elif projectile[2] > 360:
+                self.projectiles.remove(projectile)
+            elif abs(self.player.dashing)<50 and player_rect.collidepoint(projectile[0]):
+                self.projectiles.remove(projectile)
                 self.dead += 1
-                if self.dead >= 10:
-                    self.transition = min(30, self.transition + 1)
-                if self.dead > 40:
-                    self.lives -= 1
-                    if self.lives <= 0:
-                        self.reset_game()
-                    else:
-                        for d in self.doors:
-                            if d['variant'] == 0:
-                                self.player.pos = list(d['pos'])
-                                self.player.velocity = [0,0]
-                                self.player.air_time = 0
-                                break
-                    self.dead = 0
-                    self.transition = -30
-            
-            self.scroll[0] += (self.player.rect().centerx - self.display.get_width()/2 - self.scroll[0])/30
-            self.scroll[1] += (self.player.rect().centery - self.display.get_height()/2 - self.scroll[1])/30
-            r_scroll = (int(self.scroll[0]), int(self.scroll[1]))
-            
-            # Leaf spawn
-            for rect in self.leaf_spawners:
-                if random.random()*49999 < rect.width*rect.height:
-                    ps = (rect.x+random.random()*rect.width, rect.y+random.random()*rect.height)
-                    self.particles.append(VFXParticle(self, 'leaf', ps, velocity=[-0.1,0.3], frame=random.randint(0,20)))
-            
-            self.clouds.update()
-            self.clouds.render(self.display_2, offset=r_scroll)
-            
-            self.tilemap.render(self.display, offset=r_scroll)
-            
-            # Doors
-            for door in self.doors:
-                img = self.assets['doors'][door['variant']]
-                self.display.blit(img, (door['pos'][0]-r_scroll[0], door['pos'][1]-r_scroll[1]))
-            
-            # Coins
-            for c in self.coins.copy():
-                c_rect = pygame.Rect(c['pos'][0], c['pos'][1], self.tilemap.tile_size, self.tilemap.tile_size)
-                vertical_offset = math.sin(self.game_time*0.05)*2
-                c_y = c['pos'][1]+vertical_offset
-                img = self.assets['coin'][0]
-                self.display.blit(img, (c['pos'][0]-r_scroll[0], c_y - r_scroll[1]))
-                c_rect.y = c_y
-                if self.player.rect().colliderect(c_rect):
-                    self.coins.remove(c)
-                    self.score += 50
-                    self.sfx['coin'].play()
-
-            # Enemies
-            for foe in self.enemies.copy():
-                kill = foe.update(self.tilemap, (0,0))
-                foe.render(self.display, offset=r_scroll)
-                if kill:
-                    self.enemies.remove(foe)
-                    self.score += 100
-                    self.screenshake = max(16, self.screenshake)
-                    self.sfx['hit'].play()
-            
-            # Player
-            if not self.dead:
-                self.player.update(self.tilemap, (self.movement[1]-self.movement[0],0))
-                self.player.render(self.display, offset=r_scroll)
-            
-            # Check level transition
-            for d in self.doors:
-                if d['variant'] == 1:
-                    d_rect = pygame.Rect(d['pos'][0], d['pos'][1], self.tilemap.tile_size, self.tilemap.tile_size)
-                    if self.player.rect().colliderect(d_rect):
-                        self.level += 1
-                        self.load_level(self.level)
-                        break
-
-            # Projectiles
-            for projectile in self.projectiles.copy():
-                projectile[0][0] += projectile[1]
-                projectile[2] += 1
-                p_img = self.assets['projectile']
-                self.display.blit(p_img, (projectile[0][0]-p_img.get_width()/2 - r_scroll[0], projectile[0][1]-p_img.get_height()/2 - r_scroll[1]))
-                if self.tilemap.solid_check(projectile[0]):
-                    self.projectiles.remove(projectile)
-                    for i in range(4):
-                        self.sparks.append(Ember(projectile[0], random.random()-0.5+(math.pi if projectile[1]>0 else 0), 2+random.random()))
-                elif projectile[2] > 360:
-                    self.projectiles.remove(projectile)
-                elif abs(self.player.dashing)<50 and self.player.rect().collidepoint(projectile[0]):
-                    self.projectiles.remove(projectile)
-                    self.dead += 1
-                    self.sfx['hit'].play()
-                    self.screenshake = max(16, self.screenshake)
-                    for i in range(30):
-                        angle = random.random()*math.pi*2
-                        speed = random.random()*5
-                        self.sparks.append(Ember(self.player.rect().center, angle, 2+random.random()))
-                        self.particles.append(VFXParticle(self, 'particle', self.player.rect().center, velocity=[math.cos(angle+math.pi)*speed*0.5, math.sin(angle+math.pi)*speed*0.5], frame=random.randint(0,7)))
-            
-            # Sparks
-            for s in self.sparks.copy():
-                remove = s.update()
-                s.render(self.display, offset=r_scroll)
-                if remove:
-                    self.sparks.remove(s)
-            
-            # Silhouette
+                self.sfx.play('hit')
+                self.screenshake = max(16, self.screenshake)
+                for i in range(30):
+                    angle = self.rng['fx'].random()*math.pi*2
+                    speed = self.rng['fx'].random()*5
+                    self.sparks.emit(player_rect.center, angle, 2+self.rng['fx'].random())
+                    self.particles.emit('particle', player_rect.center, velocity=[math.cos(angle+math.pi)*speed*0.5, math.sin(angle+math.pi)*speed*0.5], frame=self.rng['fx'].randint(0,7))
+        
+        prof.mark('sim/projectiles')
+        
+        # Sparks and particles
+        self.sparks.update()
+        self.particles.update()
+        prof.mark('sim/effects')
+        
+        # Update high score
+        if self.score > self.high_score:
+            self.high_score = self.score
+            self.save_data.set('high_score', self.high_score)
+    
+    def state_hash(self):
+        # Fingerprint of everything the simulation depends on (not the saved high score)
+        state = {
+            'time': self.game_time, 'level': self.level, 'score': self.score, 'lives': self.lives, 'dead': self.dead,
+            'player': [self.player.pos, self.player.velocity, self.player.dashing, self.player.air_time, self.player.jumps],
+            'enemies': [[e.pos, e.velocity, e.walking, e.flip] for e in self.enemies],
+            'projectiles': self.projectiles,
+            'coins': [c['pos'] for c in self.coins.values()],
+            'effects': [len(self.particles), len(self.sparks)],
+        }
+        return hashlib.sha256(json.dumps(state).encode()).hexdigest()
+    
+    def render(self):
+        # Draw the current world state; the simulation never depends on this
+        prof = self.profiler
+        self.display.fill((0,0,0,0))
+        self.display_2.blit(self.assets['background'], (0,0))
+        
+        r_scroll = (int(self.scroll[0]), int(self.scroll[1]))
+        
+        self.clouds.render(self.display_2, offset=r_scroll)
+        prof.mark('clouds')
+        
+        outlines = self.outlines if self.outline_quality == 'sprites' else None
+        self.tilemap.render(self.display, offset=r_scroll, outlines=outlines)
+        prof.mark('tilemap')
+        
+        # Sprites are queued and submitted in one batch before the sparks
+        queue = self.render_queue
+        
+        # Only objects overlapping the view are drawn (with slack for image overhang and coin bob)
+        view = pygame.Rect(r_scroll, self.display.get_size()).inflate(32, 32)
+        
+        # Doors
+        for door in self.door_grid.query(view):
+            img = self.assets['doors'][door['variant']]
+            queue.blit(img, (door['pos'][0]-r_scroll[0], door['pos'][1]-r_scroll[1]))
+        
+        # Coins
+        vertical_offset = math.sin(self.game_time*0.05)*2
+        img = self.assets['coin'][0]
+        queue.blits((img, (c['pos'][0]-r_scroll[0], c['pos'][1]+vertical_offset - r_scroll[1])) for c in self.coin_grid.query(view))
+        prof.mark('coins')
+        
+        # Enemies
+        for foe in self.enemy_grid.query(view):
+            foe.render(queue, offset=r_scroll)
+        prof.mark('enemies')
+        
+        # Player
+        if not self.dead:
+            self.player.render(queue, offset=r_scroll)
+        prof.mark('player')
+        
+        # Projectiles
+        p_img = self.assets['projectile']
+        queue.blits((p_img, (projectile[0][0]-p_img.get_width()/2 - r_scroll[0], projectile[0][1]-p_img.get_height()/2 - r_scroll[1])) for projectile in self.projectiles if view.collidepoint(projectile[0]))
+        
+        prof.mark('projectiles')
+        
+        # The phases above only queue; the blits and cached outlines happen here
+        queue.flush(self.display, outlines=outlines)
+        prof.mark('sprites')
+        
+        # Sparks
+        self.sparks.render(self.display, offset=r_scroll)
+        prof.mark('sparks')
+        
+        # Silhouette over everything drawn so far, only at full quality
+        if self.outline_quality == 'full':
             display_mask = pygame.mask.from_surface(self.display)
             sillhouette = display_mask.to_surface(setcolor=(0,0,0,180), unsetcolor=(0,0,0,0))
             for off in [(-1,0),(1,0),(0,-1),(0,1)]:
                 self.display_2.blit(sillhouette, off)
-            
-            # Particles
-            for p in self.particles.copy():
-                rem = p.update()
-                p.render(self.display, offset=r_scroll)
-                if p.type == 'leaf':
-                    p.pos[0] += math.sin(p.animation.frame*0.035)*0.3
-                if rem:
-                    self.particles.remove(p)
-            
+        prof.mark('silhouette')
+        
+        # Particles
+        self.particles.render(queue, offset=r_scroll)
+        queue.flush(self.display)
+        prof.mark('particles')
+        
+        # Transition effect
+        if self.transition:
+            self.display.blit(self.iris[abs(self.transition)], (0,0))
+        
+        self.display_2.blit(self.display, (0,0))
+        
+        # Render HUD with shadows and lives
+        self.hud.render(self.display_2, self.score, self.high_score, self.lives)
+        prof.mark('hud')
+        prof.count('hud redraws', self.hud.redraws)
+        
+        # Ending message once the last level is cleared
+        if self.complete:
+            # Rendered once per score and font, like the HUD
+            if self.win_text is None or self.win_text[0] != (self.score, self.font):
+                label = 'You win! Final score: ' + str(self.score)
+                self.win_text = ((self.score, self.font), self.font.render(label, True, (0, 0, 0)), self.font.render(label, True, (255, 255, 255)))
+            key, shadow, text = self.win_text
+            pos = (self.display_2.get_width()//2 - text.get_width()//2, self.display_2.get_height()//2 - text.get_height()//2)
+            self.display_2.blit(shadow, (pos[0] + 1, pos[1] + 1))
+            self.display_2.blit(text, pos)
+        
+        self.profiler.render(self.display_2, self.font)
+        prof.mark('profiler')
+        
+        shake_off = (self.rng['shake'].random()*self.screenshake - self.screenshake/2, self.rng['shake'].random()*self.screenshake - self.screenshake/2)
+        self.present(shake_off)
+        prof.mark('present')
+    
+    def present(self, offset=(0, 0)):
+        pygame.transform.scale(self.display_2, self.scaled.get_size(), self.scaled)
+        self.screen.blit(self.scaled, offset)
+        pygame.display.update()
+    
+    def run(self):
+        # Music starts once the loader thread is done; the ambience waits for its sound to load
+        self.sfx.play('ambience', loops=-1)
+        
+        lag = 0
+        while True:
+            self.profiler.begin_frame()
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
-                    self.save_high_score()
+                    if self.recorder is not None:
+                        self.recorder.finish(self.state_hash())
+                    if self.profile_path:
+                        self.profiler.export(self.profile_path)
+                    self.save_data.flush()
                     pygame.quit()
                     sys.exit()
                 if event.type == pygame.KEYDOWN:
@@ -276,54 +488,55 @@ class JumperGame:
                     if event.key == pygame.K_RIGHT:
                         self.movement[1] = True
                     if event.key == pygame.K_UP:
-                        if self.player.jump():
-                            self.sfx['jump'].play()
+                        self.jump_queued = True
                     if event.key == pygame.K_x:
-                        self.player.dash()
+                        self.dash_queued = True
+                    if event.key == pygame.K_o:
+                        # Cycle outline quality
+                        self.outline_quality = OUTLINE_QUALITIES[(OUTLINE_QUALITIES.index(self.outline_quality) + 1) % len(OUTLINE_QUALITIES)]
+                    if event.key == pygame.K_F3:
+                        self.profiler.toggle()
+                    if event.key == pygame.K_F4:
+                        self.profiler.export(self.profile_path or 'frame_trace.csv')
                 if event.type == pygame.KEYUP:
                     if event.key == pygame.K_LEFT:
                         self.movement[0] = False
                     if event.key == pygame.K_RIGHT:
                         self.movement[1] = False
             
-            # Transition effect
-            if self.transition:
-                transition_surf = pygame.Surface(self.display.get_size())
-                pygame.draw.circle(transition_surf, (255,255,255), (self.display.get_width()//2, self.display.get_height()//2), (30 - abs(self.transition))*8)
-                transition_surf.set_colorkey((255,255,255))
-                self.display.blit(transition_surf, (0,0))
-                
-            self.display_2.blit(self.display, (0,0))
+            self.profiler.mark('input')
             
-            # Update high score
-            if self.score > self.high_score:
-                self.high_score = self.score
-
-            # Render HUD with shadows
-            score_shadow = self.font.render(f'Score: {self.score}', True, (0,0,0))
-            self.display_2.blit(score_shadow, (11,11))
-            score_text = self.font.render(f'Score: {self.score}', True, (255,255,255))
-            self.display_2.blit(score_text, (10,10))
-
-            high_score_shadow = self.font.render(f'High Score: {self.high_score}', True, (0,0,0))
-            self.display_2.blit(high_score_shadow, (11,23))
-            high_score_text = self.font.render(f'High Score: {self.high_score}', True, (255,255,255))
-            self.display_2.blit(high_score_text, (10,22))
-
-            # Lives (hearts)
-            for i in range(self.lives):
-                x = 10 + i*(self.assets['heart'].get_width()+2)
-                y = 34
-                heart_shadow = self.assets['heart'].copy()
-                heart_shadow.fill((0,0,0,150), special_flags=pygame.BLEND_RGBA_MULT)
-                self.display_2.blit(heart_shadow, (x+1,y+1))
-                self.display_2.blit(self.assets['heart'], (x,y))
+            # Fixed-timestep simulation, decoupled from the render rate
+            lag = min(lag + self.clock.tick(FPS), TICK_MS * MAX_STEPS_PER_FRAME)
+            self.profiler.mark('idle')
+            while lag >= TICK_MS:
+                self.step()
+                lag -= TICK_MS
+            self.sfx.flush((self.scroll[0] + self.display.get_width()/2, self.scroll[1] + self.display.get_height()/2))
+            for name, value in self.sfx.stats.items():
+                self.profiler.count('sfx ' + name, value)
             
-            shake_off = (random.random()*self.screenshake - self.screenshake/2, random.random()*self.screenshake - self.screenshake/2)
-            self.screen.blit(pygame.transform.scale(self.display_2, self.screen.get_size()), shake_off)
-            pygame.display.update()
-            self.clock.tick(60)
+            self.render()
+            self.profiler.end_frame()
+            if not self.first_game_frame:
+                self.first_game_frame = True
+                self.startup.mark('first game frame')
+            self.finish_deferred()
             
-            self.save_high_score()
-
-JumperGame().run()
\ No newline at end of file
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Block Jumper Adventure')
+    parser.add_argument('--seed', type=int, help='seed for the game\'s random streams')
+    parser.add_argument('--record', metavar='PATH', help='write an input log for replay.py on quit')
+    parser.add_argument('--outline', choices=OUTLINE_QUALITIES, default='sprites', help='sprite outline detail (O cycles it in game)')
+    parser.add_argument('--wake-margin', type=int, default=WAKE_MARGIN, metavar='PX', help='distance beyond the view at which sleeping enemies wake up')
+    parser.add_argument('--scale', type=int, default=WINDOW_SCALE, help='window size as a multiple of the 320x240 game view')
+    parser.add_argument('--profile', metavar='PATH', help='collect frame timings from the start and write them to PATH (.csv or .json) on quit; F3 shows the overlay')
+    parser.add_argument('--measure-startup', action='store_true', help='print the time to first frame by phase and quit once background loading is done')
+    args = parser.parse_args()
+    
+    seed = random.randrange(2**32) if args.seed is None else args.seed
+    recorder = None
+    if args.record:
+        from scripts.replay import InputLog
+        recorder = InputLog(seed, path=args.record, wake_margin=args.wake_margin)
+    JumperGame(seed=seed, recorder=recorder, outline=args.outline, profile=args.profile, wake_margin=args.wake_margin, scale=args.scale, measure_startup=args.measure_startup).run()
\ No newline at end of file
@@ -0,0 +1,33 @@
+import sys
+import time
+import argparse
+
+from jumper import JumperGame
+from scripts.replay import InputLog
+
+def replay(game, log):
+    # Re-simulate a log on a fresh headless game as fast as possible
+    for movement, jump, dash in log.ticks():
+        game.step(movement, jump, dash)
+    return game.state_hash()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay recorded input logs and verify their final state hash')
+    parser.add_argument('logs', nargs='+', metavar='LOG', help='input log written by jumper.py --record')
+    args = parser.parse_args()
+    
+    failed = 0
+    for path in args.logs:
+        log = InputLog()
+        log.load(path)
+        game = JumperGame(headless=True, seed=log.seed, wake_margin=log.wake_margin)
+        start = time.perf_counter()
+        state_hash = replay(game, log)
+        elapsed = time.perf_counter() - start
+        ok = state_hash == log.final_hash
+        failed += not ok
+        print(f"{path}: {'OK' if ok else 'MISMATCH'} {len(log)} ticks in {elapsed:.2f}s ({len(log)/max(elapsed, 1e-9):.0f} ticks/s) score={game.score} level={game.level}")
+        if not ok:
+            print(f'  expected {log.final_hash}')
+            print(f'  got      {state_hash}')
+    sys.exit(1 if failed else 0)
\ No newline at end of file
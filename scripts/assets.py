@@ -0,0 +1,153 @@
+import os
+import sys
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pygame
+
+IMAGE_EXTS = ('.png', '.webp', '.jpg', '.jpeg', '.bmp', '.gif')
+CACHE_VERSION = 1
+ATLAS_WIDTH = 1024  # atlas rows are this wide; a wider image widens the whole atlas
+
+def image_key(path, size=None):
+    # Scaled copies are cached under their own key, so a huge source is only decoded when it changes
+    return path if size is None else '%s@%dx%d' % (path, size[0], size[1])
+
+def pack(sizes, width):
+    # Shelf packing, tallest first; returns {key: (x, y)} and the atlas height
+    positions = {}
+    x = y = shelf = 0
+    for key, (w, h) in sorted(sizes.items(), key=lambda item: (-item[1][1], item[0])):
+        if x + w > width:
+            x, y, shelf = 0, y + shelf, 0
+        positions[key] = (x, y)
+        x += w
+        shelf = max(shelf, h)
+    return positions, y + shelf
+
+class ImageCache:
+    # Every image the game asks for, kept as one raw RGBA atlas plus a JSON manifest in a single
+    # cache file. Entries remember the mtime and size of their source, so warm starts decode nothing
+    # and a cold start decodes the changed files in parallel on a thread pool
+    def __init__(self, base_path, cache_path):
+        self.base_path = base_path
+        self.cache_path = cache_path
+        self.opened = False
+        self.sources = {}  # path -> [mtime_ns, size] of every image file on disk
+        self.entries = {}  # key -> [source path, source stat]
+        self.images = {}  # key -> RGBA surface
+        self.pending = {}  # path -> future of a full size decode
+        self.decoded = {}  # path -> full size surface decoded this run
+        self.dirty = False
+    
+    def scan(self):
+        self.sources = {}
+        for root, dirs, files in os.walk(self.base_path):
+            for name in files:
+                if os.path.splitext(name)[1].lower() in IMAGE_EXTS:
+                    full = os.path.join(root, name)
+                    stat = os.stat(full)
+                    self.sources[os.path.relpath(full, self.base_path).replace(os.sep, '/')] = [stat.st_mtime_ns, stat.st_size]
+    
+    def read(self):
+        # Manifest line, then the atlas pixels; a missing or damaged cache is just a cold start
+        try:
+            with open(self.cache_path, 'rb') as f:
+                manifest = json.loads(f.readline())
+                if manifest.get('version') != CACHE_VERSION:
+                    return {}
+                atlas = pygame.image.frombytes(f.read(), manifest['size'], 'RGBA') if manifest['images'] else None
+        except (OSError, ValueError, KeyError, pygame.error):
+            return {}
+        for key, (src, stat, rect) in manifest['images'].items():
+            if self.sources.get(src) == stat:
+                self.entries[key] = [src, stat]
+                self.images[key] = atlas.subsurface(rect)
+            else:
+                # Kept without a stat so the build step can redo it; save() drops it otherwise
+                self.entries[key] = [src, None]
+                self.dirty = True
+        return manifest
+    
+    def open(self, jobs=None):
+        self.opened = True
+        self.scan()
+        known = self.read().get('sources', {})
+        stale = [path for path, stat in self.sources.items() if known.get(path) != stat]
+        if stale or known.keys() != self.sources.keys():
+            self.dirty = True
+        if stale:
+            # Decoding runs in the background; get() only waits for the files it actually needs
+            pool = ThreadPoolExecutor(max_workers=jobs or os.cpu_count())
+            self.pending = {path: pool.submit(self.decode, path) for path in stale}
+            pool.shutdown(wait=False)
+    
+    def decode(self, path):
+        img = pygame.image.load(self.base_path + path)
+        if img.get_flags() & pygame.SRCALPHA and img.get_colorkey() is None:
+            return img
+        # Normalise the rest to RGBA; a palette colorkey becomes alpha so every source packs the same way
+        return pygame.image.frombytes(pygame.image.tobytes(img, 'RGBA'), img.get_size(), 'RGBA')
+    
+    def source(self, path):
+        if path not in self.decoded:
+            future = self.pending.pop(path, None)
+            self.decoded[path] = future.result() if future else self.decode(path)
+        return self.decoded[path]
+    
+    def get(self, path, size=None):
+        # RGBA surface for an image path relative to base_path, scaled when size is given
+        if not self.opened:
+            self.open()
+        key = image_key(path, size)
+        img = self.images.get(key)
+        if img is None:
+            img = self.source(path)
+            if size is not None:
+                img = pygame.transform.scale(img, size)
+            self.images[key] = img
+            self.entries[key] = [path, self.sources.get(path)]
+            self.dirty = True
+        return img
+    
+    def save(self):
+        # Rewrite the cache file when anything was decoded; replaced atomically so parallel runs are safe
+        if not self.dirty:
+            return
+        keys = [key for key, (src, stat) in self.entries.items() if stat is not None]
+        width = max([ATLAS_WIDTH] + [self.images[key].get_width() for key in keys])
+        positions, height = pack({key: self.images[key].get_size() for key in keys}, width)
+        atlas = pygame.Surface((width, max(height, 1)), pygame.SRCALPHA)
+        images = {}
+        for key, pos in positions.items():
+            # BLEND_RGBA_MAX onto the cleared atlas copies pixels exactly, alpha included
+            atlas.blit(self.images[key], pos, special_flags=pygame.BLEND_RGBA_MAX)
+            images[key] = self.entries[key] + [list(pos) + list(self.images[key].get_size())]
+        manifest = {'version': CACHE_VERSION, 'size': list(atlas.get_size()), 'sources': self.sources, 'images': images}
+        os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+        tmp_path = '%s.%d.tmp' % (self.cache_path, os.getpid())
+        with open(tmp_path, 'wb') as f:
+            f.write(json.dumps(manifest).encode() + b'\n')
+            f.write(pygame.image.tobytes(atlas, 'RGBA'))
+        os.replace(tmp_path, self.cache_path)
+        self.dirty = False
+
+if __name__ == '__main__':
+    # Build step: python -m scripts.assets [--clean] decodes every image in parallel and packs the atlas.
+    # Scaled copies already in the cache are kept; sources wider or taller than the atlas are only
+    # packed at the sizes the game asks for
+    from scripts.utils import BASE_IMG_PATH, IMAGE_CACHE_PATH
+    if '--clean' in sys.argv and os.path.exists(IMAGE_CACHE_PATH):
+        os.remove(IMAGE_CACHE_PATH)
+    start = time.perf_counter()
+    cache = ImageCache(BASE_IMG_PATH, IMAGE_CACHE_PATH)
+    cache.open()
+    cached = {src for src, stat in cache.entries.values() if stat is not None}
+    for path in sorted(cache.sources):
+        if path not in cached and max(cache.source(path).get_size()) <= ATLAS_WIDTH:
+            cache.get(path)
+    for key, (src, stat) in list(cache.entries.items()):
+        if stat is None and src in cache.sources:
+            cache.get(src, tuple(int(n) for n in key.rsplit('@', 1)[1].split('x')) if key != src else None)
+    cache.save()
+    print('%d images in %s (%.0f ms)' % (len(cache.images), IMAGE_CACHE_PATH, (time.perf_counter() - start) * 1000))
\ No newline at end of file
@@ -0,0 +1,122 @@
+import os
+import pygame
+
+# name -> (file, volume, most voices at once, priority). Higher priorities are mixed first each
+# frame and only STEAL_PRIORITY and above may take a channel from another sound when all are busy
+SOUNDS = {
+    'hit': ('data/sfx/hit.wav', 0.8, 2, 3),
+    'jump': ('data/sfx/jump.wav', 0.7, 1, 2),
+    'dash': ('data/sfx/dash.wav', 0.3, 1, 2),
+    'shoot': ('data/sfx/shoot.wav', 0.4, 3, 1),
+    'coin': ('data/sfx/coin.wav', 0.2, 2, 0),
+    'ambience': ('data/sfx/ambience.wav', 0.2, 1, 0),
+}
+STEAL_PRIORITY = 3
+HEAR_DISTANCE = 320  # px from the centre of the view beyond which positional sounds are dropped
+MUSIC = ('data/music.wav', 0.5)
+
+class SoundManager:
+    # The game's sound effects: play() only queues, and flush() mixes once per frame with
+    # repeats merged, per-sound voice caps, priorities and distance culling
+    def __init__(self, sounds=SOUNDS, enabled=True, hear_distance=HEAR_DISTANCE, load_now=True):
+        # Headless games, a missing mixer and missing files all end up silent rather than failing.
+        # With load_now=False nothing is decoded until load(), which may run on a worker thread
+        self.enabled = enabled and bool(pygame.mixer.get_init())
+        self.hear_distance = hear_distance
+        self.specs = sounds
+        self.sounds = {}
+        self.caps = {}
+        self.priorities = {}
+        self.channels = {}
+        for name, (path, volume, voices, priority) in sounds.items():
+            self.sounds[name] = None
+            self.caps[name] = voices
+            self.priorities[name] = priority
+            self.channels[name] = []
+        self.loaded = False
+        # Loops get a reserved channel so a stolen voice never cuts the ambience
+        if self.enabled:
+            pygame.mixer.set_reserved(1)
+        self.loop_channel = pygame.mixer.Channel(0) if self.enabled else None
+        self.order = sorted(sounds, key=lambda name: -self.priorities[name])
+        self.requests = {}  # name -> [loops, positions or None for sounds heard everywhere]
+        self.waiting = set()  # loops asked for before their sound was loaded
+        self.stats = {'played': 0, 'merged': 0, 'capped': 0, 'culled': 0, 'dropped': 0}
+        if load_now:
+            self.load()
+    
+    def load(self):
+        # Sounds are swapped in one at a time, so playing can start before the slow ones are done
+        if self.enabled:
+            for name, (path, volume, voices, priority) in self.specs.items():
+                try:
+                    sound = pygame.mixer.Sound(path)
+                except FileNotFoundError:
+                    continue
+                sound.set_volume(volume)
+                self.sounds[name] = sound
+        self.loaded = True
+    
+    def stream_music(self, path=MUSIC[0], volume=MUSIC[1]):
+        # pygame.mixer.music decodes as it plays, so a long track costs nothing up front
+        if not self.enabled or not os.path.exists(path):
+            return
+        pygame.mixer.music.load(path)
+        pygame.mixer.music.set_volume(volume)
+        pygame.mixer.music.play(-1)
+    
+    def play(self, name, pos=None, loops=0):
+        # Queue a sound for this frame; pos is its world position for distance culling
+        if not self.enabled:
+            return
+        if self.sounds[name] is None:
+            # Unloaded sounds are silent placeholders; a loop waits for its sound instead of being lost
+            if loops < 0:
+                self.waiting.add(name)
+            return
+        request = self.requests.get(name)
+        if request is None:
+            self.requests[name] = [loops, None if pos is None else [pos]]
+            return
+        self.stats['merged'] += 1
+        request[0] = min(request[0], loops)  # -1 loops forever
+        if pos is None:
+            request[1] = None
+        elif request[1] is not None:
+            request[1].append(pos)
+    
+    def flush(self, listener):
+        # Mix this frame's requests; listener is the world position of the centre of the view
+        if self.waiting and self.loaded:
+            waiting, self.waiting = self.waiting, set()
+            for name in waiting:
+                if self.sounds[name] is not None:
+                    self.play(name, loops=-1)
+        if not self.requests:
+            return
+        hear_sq = self.hear_distance ** 2
+        for name in self.order:
+            request = self.requests.get(name)
+            if request is None:
+                continue
+            loops, positions = request
+            if positions is not None and all((p[0] - listener[0]) ** 2 + (p[1] - listener[1]) ** 2 > hear_sq for p in positions):
+                self.stats['culled'] += 1
+                continue
+            sound = self.sounds[name]
+            channels = [c for c in self.channels[name] if c.get_busy() and c.get_sound() is sound]
+            self.channels[name] = channels
+            if len(channels) >= self.caps[name]:
+                self.stats['capped'] += 1
+                continue
+            if loops < 0:
+                channel = self.loop_channel
+            else:
+                channel = pygame.mixer.find_channel(self.priorities[name] >= STEAL_PRIORITY)
+            if channel is None:
+                self.stats['dropped'] += 1
+                continue
+            channel.play(sound, loops)
+            channels.append(channel)
+            self.stats['played'] += 1
+        self.requests.clear()
\ No newline at end of file
@@ -1,36 +1,65 @@
 import random
+import pygame
 
-class SkyCloud:
-    # Individual cloud with parallax
-    def __init__(self, pos, img, speed, depth):
-        self.pos = list(pos)
-        self.img = img
+class CloudBand:
+    # Clouds sharing one depth and speed, baked into a strip that tiles in both directions.
+    # The strip is one view wider than its period, so a single blit covers the width and
+    # a vertical wrap needs at most one more
+    def __init__(self, clouds, speed, depth):
+        self.clouds = clouds  # (x, y, img) with x and y as fractions of the period
         self.speed = speed
         self.depth = depth
+        self.x = 0
+        self.strip = None
+        self.period = (0, 0)
     
     def update(self):
-        self.pos[0] += self.speed
+        self.x += self.speed
+    
+    def bake(self, view_size):
+        # A cloud spends its own width off screen before wrapping, like a single cloud did
+        max_w = max([img.get_width() for x, y, img in self.clouds] + [0])
+        max_h = max([img.get_height() for x, y, img in self.clouds] + [0])
+        self.period = (view_size[0] + max_w, view_size[1] + max_h)
+        pw, ph = self.period
+        self.strip = pygame.Surface((pw + view_size[0], ph))
+        self.strip.fill((0, 0, 0))
+        for x, y, img in self.clouds:
+            # Copies one period away on each side keep clouds whole across the seams
+            for i in range(-1, 3):
+                for j in range(-1, 2):
+                    self.strip.blit(img, (int(x * pw) + i * pw, int(y * ph) + j * ph))
+        self.strip.set_colorkey((0, 0, 0), pygame.RLEACCEL)
         
     def render(self, surf, offset=(0, 0)):
-        rp = (self.pos[0]-offset[0]*self.depth, self.pos[1]-offset[1]*self.depth)
-        surf.blit(self.img, (rp[0] % (surf.get_width()+self.img.get_width()) - self.img.get_width(), 
-                             rp[1] % (surf.get_height()+self.img.get_height()) - self.img.get_height()))
+        pw, ph = self.period
+        w, h = surf.get_size()
+        u = int(offset[0] * self.depth - self.x) % pw
+        v = int(offset[1] * self.depth) % ph
+        surf.blit(self.strip, (0, 0), (u, v, w, min(h, ph - v)))
+        if ph - v < h:
+            surf.blit(self.strip, (0, ph - v), (u, 0, w, h - (ph - v)))
 
 class SkyClouds:
-    # Collection of clouds
-    def __init__(self, cloud_images, count=16):
-        self.clouds = []
-        for i in range(count):
-            self.clouds.append(SkyCloud((random.random()*99999, random.random()*99999), 
-                                        random.choice(cloud_images), 
-                                        random.random()*0.05+0.05, 
-                                        random.random()*0.6+0.2))
-        self.clouds.sort(key=lambda c: c.depth)
+    # Clouds grouped into parallax bands, each costing at most two blits per frame whatever the cloud count
+    def __init__(self, cloud_images, count=16, rng=random, bands=3):
+        self.bands = []
+        for i in range(bands):
+            # Nearer bands move faster, both on their own and with the camera
+            t = (i + 0.5) / bands
+            clouds = [(rng.random(), rng.random(), rng.choice(cloud_images)) for c in range(count * (i + 1) // bands - count * i // bands)]
+            self.bands.append(CloudBand(clouds, 0.05 + t * 0.05, 0.2 + t * 0.6))
+        self.view_size = None
     
     def update(self):
-        for c in self.clouds:
-            c.update()
+        for band in self.bands:
+            band.update()
     
     def render(self, surf, offset=(0, 0)):
-        for c in self.clouds:
-            c.render(surf, offset=offset)
\ No newline at end of file
+        # Strips are baked on first use, so headless games never build them
+        if surf.get_size() != self.view_size:
+            self.view_size = surf.get_size()
+            for band in self.bands:
+                band.bake(self.view_size)
+        for band in self.bands:
+            band.render(surf, offset=offset)
\ No newline at end of file
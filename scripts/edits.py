@@ -0,0 +1,89 @@
+from collections import deque
+
+FILL_LIMIT = 65536  # most tiles a single flood fill may touch
+
+class EditHistory:
+    # Undo/redo of editor strokes, each stored as a compact diff: the old grid tiles by
+    # location (None = empty) plus (key, tile) pairs for offgrid tiles added and removed
+    def __init__(self, tilemap, limit=200):
+        self.tilemap = tilemap
+        self.limit = limit
+        self.undo_stack = []
+        self.redo_stack = []
+        self.current = None
+    
+    def begin(self):
+        if self.current is None:
+            self.current = ({}, [], [])
+    
+    def record(self, undo):
+        # Merge the result of WorldMap.apply(); the first old value of a location wins
+        for loc, old in undo.items():
+            self.current[0].setdefault(loc, old)
+    
+    def set_tiles(self, changes):
+        self.begin()
+        self.record(self.tilemap.apply(changes))
+    
+    def add_offgrid(self, tile):
+        self.begin()
+        self.current[1].append((self.tilemap.add_offgrid(tile), tile))
+    
+    def remove_offgrid(self, tile):
+        self.begin()
+        key = self.tilemap.remove_offgrid(tile)
+        for i, added in enumerate(self.current[1]):
+            if added[1] is tile:
+                del self.current[1][i]
+                return
+        self.current[2].append((key, tile))
+    
+    def end(self):
+        # Close the stroke; strokes that changed nothing leave no entry
+        diff, self.current = self.current, None
+        if diff and any(diff):
+            self.undo_stack.append(diff)
+            del self.undo_stack[:-self.limit]
+            self.redo_stack = []
+    
+    def revert(self, diff):
+        # Undo a diff and return the diff that redoes it
+        tiles, added, removed = diff
+        redo_tiles = self.tilemap.apply(tiles)
+        for key, tile in added:
+            self.tilemap.remove_offgrid(tile)
+        for key, tile in removed:
+            self.tilemap.add_offgrid(tile, key)
+        return (redo_tiles, removed, added)
+    
+    def undo(self):
+        self.end()
+        if self.undo_stack:
+            self.redo_stack.append(self.revert(self.undo_stack.pop()))
+    
+    def redo(self):
+        self.end()
+        if self.redo_stack:
+            self.undo_stack.append(self.revert(self.redo_stack.pop()))
+
+def rect_locs(a, b):
+    # Every grid location in the rectangle spanned by two corners
+    return [(x, y) for x in range(min(a[0], b[0]), max(a[0], b[0]) + 1) for y in range(min(a[1], b[1]), max(a[1], b[1]) + 1)]
+
+def flood_locs(tilemap, start, bounds, limit=FILL_LIMIT):
+    # 4-connected locations holding the same tile type as start (or empty), kept inside bounds
+    # (min_x, min_y, max_x, max_y) so filling open space stops at the edge of the map
+    tile = tilemap.get_tile(start)
+    kind = tile['type'] if tile else None
+    found = {start}
+    queue = deque([start])
+    while queue and len(found) < limit:
+        x, y = queue.popleft()
+        for loc in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if loc in found or not (bounds[0] <= loc[0] <= bounds[2] and bounds[1] <= loc[1] <= bounds[3]):
+                continue
+            other = tilemap.get_tile(loc)
+            if (other['type'] if other else None) == kind:
+                found.add(loc)
+                queue.append(loc)
+    return found
\ No newline at end of file
@@ -1,12 +1,12 @@
 import math
-import random
 import pygame
 
-from scripts.particle import VFXParticle
-from scripts.spark import Ember
 
 class MovableEntity:
     # Entity with physics-based movement
+    __slots__ = ('game', 'kind', 'pos', 'dim', 'velocity', 'collisions', 'action', 'animation', 'anim_start', 'flip', 'last_movement')
+    anim_offset = (-3, -3)
+    
     def __init__(self, game, e_type, pos, size):
         self.game = game
         self.kind = e_type
@@ -16,7 +16,6 @@ class MovableEntity:
         self.collisions = {'up': False, 'down': False, 'right': False, 'left': False}
         
         self.action = ''
-        self.anim_offset = (-3, -3)
         self.flip = False
         self.set_action('idle')
         
@@ -28,10 +27,14 @@ class MovableEntity:
     def set_action(self, act):
         if act != self.action:
             self.action = act
-            self.animation = self.game.assets[self.kind + '/' + self.action].copy()
+            # The shared animation is played from the current tick instead of being copied
+            self.animation = self.game.assets[self.kind + '/' + self.action]
+            self.anim_start = self.game.game_time
         
     def update(self, tilemap, movement=(0, 0)):
-        self.collisions = {'up': False, 'down': False, 'right': False, 'left': False}
+        # Cleared in place rather than rebuilt every tick
+        collisions = self.collisions
+        collisions['up'] = collisions['down'] = collisions['right'] = collisions['left'] = False
         
         frame_move = (movement[0] + self.velocity[0], movement[1] + self.velocity[1])
         
@@ -74,14 +77,14 @@ class MovableEntity:
         if self.collisions['down'] or self.collisions['up']:
             self.velocity[1] = 0
             
-        self.animation.update()
-        
     def render(self, surf, offset=(0, 0)):
-        surf.blit(pygame.transform.flip(self.animation.img(), self.flip, False), 
+        surf.blit(self.animation.img(self.game.game_time - self.anim_start, self.flip), 
                   (self.pos[0]-offset[0]+self.anim_offset[0], self.pos[1]-offset[1]+self.anim_offset[1]))
 
 class Foe(MovableEntity):
     # Enemy entity with AI
+    __slots__ = ('walking',)
+    
     def __init__(self, game, pos, size):
         super().__init__(game, 'enemy', pos, size)
         self.walking = 0
@@ -103,18 +106,18 @@ class Foe(MovableEntity):
                 if abs(dis[1]) < 16:
                     # Attack logic
                     if self.flip and dis[0] < 0:
-                        self.game.sfx['shoot'].play()
+                        self.game.sfx.play('shoot', self.rect().center)
                         self.game.projectiles.append([[self.rect().centerx - 7, self.rect().centery], -1.5, 0])
                         for i in range(4):
-                            self.game.sparks.append(Ember(self.game.projectiles[-1][0], random.random()-0.5+math.pi, 2+random.random()))
+                            self.game.sparks.emit(self.game.projectiles[-1][0], self.game.rng['fx'].random()-0.5+math.pi, 2+self.game.rng['fx'].random())
                     elif (not self.flip) and dis[0] > 0:
-                        self.game.sfx['shoot'].play()
+                        self.game.sfx.play('shoot', self.rect().center)
                         self.game.projectiles.append([[self.rect().centerx + 7, self.rect().centery], 1.5, 0])
                         for i in range(4):
-                            self.game.sparks.append(Ember(self.game.projectiles[-1][0], random.random()-0.5, 2+random.random()))
+                            self.game.sparks.emit(self.game.projectiles[-1][0], self.game.rng['fx'].random()-0.5, 2+self.game.rng['fx'].random())
                             
-        elif random.random() < 0.01:
-            self.walking = random.randint(30, 120)
+        elif self.game.rng['ai'].random() < 0.01:
+            self.walking = self.game.rng['ai'].randint(30, 120)
         
         super().update(tilemap, movement=movement)
         
@@ -127,14 +130,14 @@ class Foe(MovableEntity):
         if abs(self.game.player.dashing) >= 50:
             if self.rect().colliderect(self.game.player.rect()):
                 self.game.screenshake = max(16, self.game.screenshake)
-                self.game.sfx['hit'].play()
+                self.game.sfx.play('hit', self.rect().center)
                 for i in range(30):
-                    angle = random.random()*math.pi*2
-                    speed = random.random()*5
-                    self.game.sparks.append(Ember(self.rect().center, angle, 2+random.random()))
-                    self.game.particles.append(VFXParticle(self.game, 'particle', self.rect().center, velocity=[math.cos(angle+math.pi)*speed*0.5, math.sin(angle+math.pi)*speed*0.5], frame=random.randint(0, 7)))
-                self.game.sparks.append(Ember(self.rect().center, 0, 5+random.random()))
-                self.game.sparks.append(Ember(self.rect().center, math.pi, 5+random.random()))
+                    angle = self.game.rng['fx'].random()*math.pi*2
+                    speed = self.game.rng['fx'].random()*5
+                    self.game.sparks.emit(self.rect().center, angle, 2+self.game.rng['fx'].random())
+                    self.game.particles.emit('particle', self.rect().center, velocity=[math.cos(angle+math.pi)*speed*0.5, math.sin(angle+math.pi)*speed*0.5], frame=self.game.rng['fx'].randint(0, 7))
+                self.game.sparks.emit(self.rect().center, 0, 5+self.game.rng['fx'].random())
+                self.game.sparks.emit(self.rect().center, math.pi, 5+self.game.rng['fx'].random())
                 return True
             
     def render(self, surf, offset=(0, 0)):
@@ -142,12 +145,14 @@ class Foe(MovableEntity):
         
         # Render gun
         if self.flip:
-            surf.blit(pygame.transform.flip(self.game.assets['gun'], True, False), (self.rect().centerx - 4 - self.game.assets['gun'].get_width() - offset[0], self.rect().centery - offset[1]))
+            surf.blit(self.game.assets['gun/flipped'], (self.rect().centerx - 4 - self.game.assets['gun'].get_width() - offset[0], self.rect().centery - offset[1]))
         else:
             surf.blit(self.game.assets['gun'], (self.rect().centerx + 4 - offset[0], self.rect().centery - offset[1]))
 
 class Hero(MovableEntity):
     # Player-controlled entity
+    __slots__ = ('air_time', 'jumps', 'wall_slide', 'dashing')
+    
     def __init__(self, game, pos, size):
         super().__init__(game, 'player', pos, size)
         self.air_time = 0
@@ -188,10 +193,10 @@ class Hero(MovableEntity):
         # Dashing effects
         if abs(self.dashing) in {60, 50}:
             for i in range(20):
-                ang = random.random()*math.pi*2
-                spd = random.random()*0.5+0.5
+                ang = self.game.rng['fx'].random()*math.pi*2
+                spd = self.game.rng['fx'].random()*0.5+0.5
                 pv = [math.cos(ang)*spd, math.sin(ang)*spd]
-                self.game.particles.append(VFXParticle(self.game, 'particle', self.rect().center, velocity=pv, frame=random.randint(0, 7)))
+                self.game.particles.emit('particle', self.rect().center, velocity=pv, frame=self.game.rng['fx'].randint(0, 7))
                 
         if self.dashing > 0:
             self.dashing = max(0, self.dashing - 1)
@@ -202,8 +207,8 @@ class Hero(MovableEntity):
             self.velocity[0] = abs(self.dashing)/self.dashing*8
             if abs(self.dashing) == 51:
                 self.velocity[0] *= 0.1
-            pv = [abs(self.dashing)/self.dashing*random.random()*3, 0]
-            self.game.particles.append(VFXParticle(self.game, 'particle', self.rect().center, velocity=pv, frame=random.randint(0, 7)))
+            pv = [abs(self.dashing)/self.dashing*self.game.rng['fx'].random()*3, 0]
+            self.game.particles.emit('particle', self.rect().center, velocity=pv, frame=self.game.rng['fx'].randint(0, 7))
                 
         # Horizontal drag
         if self.velocity[0] > 0:
@@ -239,5 +244,5 @@ class Hero(MovableEntity):
     def dash(self):
         # Dash action
         if not self.dashing:
-            self.game.sfx['dash'].play()
+            self.game.sfx.play('dash')
             self.dashing = -60 if self.flip else 60
\ No newline at end of file
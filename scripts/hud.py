@@ -0,0 +1,42 @@
+import pygame
+
+class HUD:
+    # Score, high score and hearts, baked into one layer that is redrawn only when they change
+    def __init__(self, font, heart):
+        self.font = font
+        self.heart = heart
+        self.heart_shadow = heart.copy()
+        self.heart_shadow.fill((0, 0, 0, 150), special_flags=pygame.BLEND_RGBA_MULT)
+        self.state = None
+        self.layer = None
+        self.redraws = 0
+    
+    def set_font(self, font):
+        # Swapping in the real font after a placeholder forces the next render to redraw
+        self.font = font
+        self.state = None
+    
+    def redraw(self, score, high_score, lives):
+        self.redraws += 1
+        texts = []
+        for label, pos in ((f'Score: {score}', (10, 10)), (f'High Score: {high_score}', (10, 22))):
+            texts.append((self.font.render(label, True, (0, 0, 0)), (pos[0] + 1, pos[1] + 1)))
+            texts.append((self.font.render(label, True, (255, 255, 255)), pos))
+        hearts = []
+        for i in range(lives):
+            x = 10 + i*(self.heart.get_width()+2)
+            y = 34
+            hearts.append((self.heart_shadow, (x+1, y+1)))
+            hearts.append((self.heart, (x, y)))
+        
+        # Layer just big enough for everything drawn on it
+        width = max(pos[0] + img.get_width() for img, pos in texts + hearts)
+        height = max(pos[1] + img.get_height() for img, pos in texts + hearts)
+        self.layer = pygame.Surface((width, height), pygame.SRCALPHA)
+        self.layer.blits(texts + hearts, doreturn=False)
+    
+    def render(self, surf, score, high_score, lives):
+        if (score, high_score, lives) != self.state:
+            self.state = (score, high_score, lives)
+            self.redraw(score, high_score, lives)
+        surf.blit(self.layer, (0, 0))
\ No newline at end of file
@@ -0,0 +1,113 @@
+import os
+import threading
+import pygame
+
+from scripts.entities import Foe
+from scripts.spatial import SpatialHash
+from scripts.tilemap import WorldMap
+
+def map_path(map_id):
+    # Prefer the binary map when it has been converted since the JSON was last edited
+    path = 'data/maps/' + str(map_id)
+    if os.path.exists(path + '.bjm') and not (os.path.exists(path + '.json') and os.path.getmtime(path + '.bjm') < os.path.getmtime(path + '.json')):
+        return path + '.bjm'
+    if os.path.exists(path + '.json'):
+        return path + '.json'
+    return None
+
+class Level:
+    # A loaded map with its objects pulled out, built without touching the running game
+    def __init__(self, game, map_id, path):
+        self.map_id = map_id
+        self.tilemap = WorldMap(game, tile_size=16)
+        self.tilemap.load(path)
+        
+        self.leaf_spawners = []
+        for tree in self.tilemap.extract([('large_decor', 2)], keep=True):
+            self.leaf_spawners.append(pygame.Rect(4+tree['pos'][0],4+tree['pos'][1],23,13))
+        
+        self.enemies = []
+        for sp in self.tilemap.extract([('spawners', 1)]):  # enemy spawners
+            self.enemies.append(Foe(game, sp['pos'], (8,15)))
+        
+        self.doors = self.tilemap.extract([('doors',0),('doors',1)])
+        self.spawn = None
+        for d in self.doors:
+            if d['variant'] == 0:
+                self.spawn = list(d['pos'])
+                break
+        
+        # Keyed by id in map order, so picking one up is O(1) and the order never changes
+        self.coins = {id(c): c for c in self.tilemap.extract([('coin',0)], keep=False)}
+        
+        # Broad-phase grids so per-tick checks only look at nearby objects
+        size = self.tilemap.tile_size
+        self.enemy_grid = SpatialHash()
+        for foe in self.enemies:
+            self.enemy_grid.insert(foe, foe.rect())
+        self.door_grid = SpatialHash()
+        for d in self.doors:
+            self.door_grid.insert(d, pygame.Rect(d['pos'][0], d['pos'][1], size, size))
+        self.coin_grid = SpatialHash()
+        for c in self.coins.values():
+            self.coin_grid.insert(c, pygame.Rect(c['pos'][0], c['pos'][1], size, size))
+    
+    def prebake(self, view_size):
+        # The camera starts at the origin and eases towards the spawn, so bake both views
+        area = pygame.Rect((0, 0), view_size)
+        if self.spawn:
+            area.union_ip(pygame.Rect(self.spawn[0] - view_size[0]//2, self.spawn[1] - view_size[1]//2, view_size[0], view_size[1]))
+        self.tilemap.prebake(area)
+
+class LevelLoader:
+    # Prepares the next level on a worker thread while the current one is played
+    def __init__(self, game, view_size=None):
+        self.game = game
+        self.view_size = view_size  # chunks around the spawn are baked too when set
+        self.map_id = None
+        self.thread = None
+        self.result = None
+        self.error = None
+    
+    def build(self, map_id):
+        path = map_path(map_id)
+        if not path:
+            return None
+        level = Level(self.game, map_id, path)
+        if self.view_size:
+            level.prebake(self.view_size)
+        return level
+    
+    def worker(self, map_id):
+        try:
+            self.result = self.build(map_id)
+        except Exception as e:
+            self.error = e
+    
+    def preload(self, map_id):
+        if self.map_id == map_id:
+            return
+        self.wait()
+        self.map_id = map_id
+        self.result = None
+        self.error = None
+        self.thread = threading.Thread(target=self.worker, args=(map_id,), daemon=True)
+        self.thread.start()
+    
+    def wait(self):
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+    
+    def take(self, map_id):
+        # The preloaded level if it matches, otherwise built now; None when the map does not exist
+        if self.map_id != map_id:
+            return self.build(map_id)
+        self.wait()
+        level, error = self.result, self.error
+        self.map_id = None
+        self.result = None
+        self.error = None
+        if error:
+            raise error
+        return level
\ No newline at end of file
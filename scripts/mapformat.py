@@ -0,0 +1,117 @@
+import sys
+import mmap
+import struct
+
+# Binary level layout (little endian):
+#   header, type name table, chunk index, offgrid tiles, then per chunk
+#   chunk_size*chunk_size type ids followed by as many variants (row-major, 0 = empty)
+MAGIC = b'BJMP'
+VERSION = 1
+HEADER = struct.Struct('<4sHHHHII')  # magic, version, tile_size, chunk_size, type count, chunk count, offgrid count
+CHUNK_ENTRY = struct.Struct('<iiII')  # chunk x, chunk y, mask of types present, data offset
+OFFGRID_ENTRY = struct.Struct('<BBdd')  # type id, variant, x, y
+
+def type_mask(type_ids, names):
+    # Bit n set means type id n+1 occurs in the chunk
+    mask = 0
+    for name in names:
+        if name in type_ids:
+            mask |= 1 << (type_ids[name] - 1)
+    return mask
+
+def write_map(path, tilemap, offgrid_tiles, tile_size, chunk_size):
+    # tilemap is keyed by (x, y) like WorldMap.tilemap
+    names = sorted({t['type'] for t in tilemap.values()} | {t['type'] for t in offgrid_tiles})
+    if len(names) > 32:
+        raise ValueError('binary maps support at most 32 tile types, got ' + str(len(names)))
+    type_ids = {name: i + 1 for i, name in enumerate(names)}
+    
+    area = chunk_size * chunk_size
+    chunks = {}
+    for (x, y), tile in tilemap.items():
+        if not 0 <= tile['variant'] < 256:
+            raise ValueError('variant out of range at ' + str((x, y)))
+        chunk = (x // chunk_size, y // chunk_size)
+        if chunk not in chunks:
+            chunks[chunk] = [bytearray(area * 2), 0]
+        i = (y - chunk[1] * chunk_size) * chunk_size + (x - chunk[0] * chunk_size)
+        chunks[chunk][0][i] = type_ids[tile['type']]
+        chunks[chunk][0][area + i] = tile['variant']
+        chunks[chunk][1] |= 1 << (type_ids[tile['type']] - 1)
+    
+    table = b''.join(bytes([len(name.encode())]) + name.encode() for name in names)
+    offgrid = b''.join(OFFGRID_ENTRY.pack(type_ids[t['type']], t['variant'], t['pos'][0], t['pos'][1]) for t in offgrid_tiles)
+    data_start = HEADER.size + len(table) + CHUNK_ENTRY.size * len(chunks) + len(offgrid)
+    
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, tile_size, chunk_size, len(names), len(chunks), len(offgrid_tiles)))
+        f.write(table)
+        order = sorted(chunks)
+        for i, chunk in enumerate(order):
+            f.write(CHUNK_ENTRY.pack(chunk[0], chunk[1], chunks[chunk][1], data_start + i * area * 2))
+        f.write(offgrid)
+        for chunk in order:
+            f.write(chunks[chunk][0])
+
+class MapFile:
+    # Memory-mapped binary level; only the header and index are read up front
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.tile_size, self.chunk_size, type_count, chunk_count, offgrid_count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(path + ' is not a version ' + str(VERSION) + ' binary map')
+        
+        pos = HEADER.size
+        self.types = [None]
+        for i in range(type_count):
+            length = self.data[pos]
+            self.types.append(self.data[pos + 1:pos + 1 + length].decode())
+            pos += 1 + length
+        self.type_ids = {name: i for i, name in enumerate(self.types) if name}
+        
+        # (cx, cy) -> (type mask, data offset)
+        self.chunks = {}
+        for i in range(chunk_count):
+            cx, cy, mask, offset = CHUNK_ENTRY.unpack_from(self.data, pos)
+            self.chunks[(cx, cy)] = (mask, offset)
+            pos += CHUNK_ENTRY.size
+        self.offgrid_offset = pos
+        self.offgrid_count = offgrid_count
+    
+    def offgrid_tiles(self):
+        tiles = []
+        for i in range(self.offgrid_count):
+            type_id, variant, x, y = OFFGRID_ENTRY.unpack_from(self.data, self.offgrid_offset + i * OFFGRID_ENTRY.size)
+            tiles.append({'type': self.types[type_id], 'variant': variant, 'pos': [x, y]})
+        return tiles
+    
+    def chunk_types(self, chunk):
+        # Raw type ids for a chunk, without building any tile dicts
+        offset = self.chunks[chunk][1]
+        return self.data[offset:offset + self.chunk_size * self.chunk_size]
+    
+    def chunk_tiles(self, chunk):
+        # Decode one chunk into ((x, y), type, variant) triples
+        area = self.chunk_size * self.chunk_size
+        offset = self.chunks[chunk][1]
+        types = self.data[offset:offset + area]
+        variants = self.data[offset + area:offset + area * 2]
+        base_x, base_y = chunk[0] * self.chunk_size, chunk[1] * self.chunk_size
+        for i, type_id in enumerate(types):
+            if type_id:
+                yield (base_x + i % self.chunk_size, base_y + i // self.chunk_size), self.types[type_id], variants[i]
+    
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+if __name__ == '__main__':
+    # Convert JSON maps: python -m scripts.mapformat data/maps/*.json
+    from scripts.tilemap import WorldMap
+    for json_path in sys.argv[1:]:
+        tilemap = WorldMap(None)
+        tilemap.load(json_path)
+        out_path = json_path.rsplit('.', 1)[0] + '.bjm'
+        tilemap.save(out_path)
+        print(json_path, '->', out_path)
\ No newline at end of file
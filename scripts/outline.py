@@ -0,0 +1,35 @@
+import weakref
+import pygame
+
+OUTLINE_COLOR = (0, 0, 0, 180)
+OUTLINE_OFFSETS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+# 'full' rebuilds a full-screen mask each frame, 'sprites' uses cached per-image outlines
+OUTLINE_QUALITIES = ('full', 'sprites', 'off')
+
+def make_outline(img):
+    # Silhouette shifted in all four directions, 1px larger than the image on every side
+    silhouette = pygame.mask.from_surface(img).to_surface(setcolor=OUTLINE_COLOR, unsetcolor=(0, 0, 0, 0))
+    outline = pygame.Surface((img.get_width() + 2, img.get_height() + 2), pygame.SRCALPHA)
+    for off in OUTLINE_OFFSETS:
+        outline.blit(silhouette, (1 + off[0], 1 + off[1]))
+    return outline
+
+class OutlineLayer:
+    # Draws the cached outline of each image it is given onto a target surface
+    def __init__(self, target):
+        self.target = target
+        # Entries go away with their image, e.g. when a tile chunk is rebaked
+        self.outlines = weakref.WeakKeyDictionary()
+    
+    def get(self, img):
+        outline = self.outlines.get(img)
+        if outline is None:
+            outline = self.outlines[img] = make_outline(img)
+        return outline
+    
+    def blit(self, img, pos):
+        self.target.blit(self.get(img), (pos[0] - 1, pos[1] - 1))
+    
+    def blits(self, commands, doreturn=False):
+        self.target.blits([(self.get(img), (pos[0] - 1, pos[1] - 1)) for img, pos in commands], doreturn=False)
\ No newline at end of file
@@ -1,24 +1,71 @@
-class VFXParticle:
-    # Animated particle effect
-    def __init__(self, game, p_type, pos, velocity=[0, 0], frame=0):
-        self.game = game
-        self.type = p_type
-        self.pos = list(pos)
-        self.vel = list(velocity)
-        self.animation = self.game.assets['particle/' + p_type].copy()
-        self.animation.frame = frame
+import numpy as np
+
+class ParticleSystem:
+    # Fixed-capacity pool of animated particles stored as parallel arrays
+    def __init__(self, animations, capacity=2048):
+        # animations maps particle type -> FrameAnimation (non-looping)
+        self.types = list(animations)
+        self.type_ids = {p_type: i for i, p_type in enumerate(self.types)}
+        self.images = [animations[p_type].images for p_type in self.types]
+        self.half_sizes = [[(img.get_width()//2, img.get_height()//2) for img in imgs] for imgs in self.images]
+        self.img_durations = np.array([animations[p_type].img_duration for p_type in self.types])
+        self.last_frames = np.array([animations[p_type].img_duration * len(animations[p_type].images) - 1 for p_type in self.types])
+        # Leaves drift sideways as they fall
+        self.sway = np.array([p_type == 'leaf' for p_type in self.types])
+        
+        self.capacity = capacity
+        self.count = 0
+        self.pos = np.zeros((capacity, 2))
+        self.vel = np.zeros((capacity, 2))
+        self.frame = np.zeros(capacity, dtype=np.int64)
+        self.kind = np.zeros(capacity, dtype=np.int64)
+    
+    def __len__(self):
+        return self.count
+    
+    def clear(self):
+        self.count = 0
+    
+    def emit(self, p_type, pos, velocity=(0, 0), frame=0):
+        # Silently drop effects once the pool is full
+        if self.count == self.capacity:
+            return
+        i = self.count
+        self.pos[i] = pos
+        self.vel[i] = velocity
+        self.frame[i] = frame
+        self.kind[i] = self.type_ids[p_type]
+        self.count += 1
     
     def update(self):
-        # Update particle and remove when done
-        if self.animation.done:
-            return True
+        n = self.count
+        if not n:
+            return
+        pos, vel, frame, kind = self.pos[:n], self.vel[:n], self.frame[:n], self.kind[:n]
+        last = self.last_frames[kind]
         
-        self.pos[0] += self.vel[0]
-        self.pos[1] += self.vel[1]
+        # Particles whose animation finished last tick are removed without moving
+        alive = frame < last
+        pos += vel
+        np.minimum(frame + 1, last, out=frame)
+        sway = self.sway[kind]
+        pos[sway, 0] += np.sin(frame[sway] * 0.035) * 0.3
         
-        self.animation.update()
-        return False
+        # Compact live slots to the front of the pool
+        if not alive.all():
+            keep = np.flatnonzero(alive)
+            m = len(keep)
+            self.pos[:m] = pos[keep]
+            self.vel[:m] = vel[keep]
+            self.frame[:m] = frame[keep]
+            self.kind[:m] = kind[keep]
+            self.count = m
     
     def render(self, surf, offset=(0, 0)):
-        img = self.animation.img()
-        surf.blit(img, (self.pos[0] - offset[0] - img.get_width()//2, self.pos[1] - offset[1] - img.get_height()//2))
\ No newline at end of file
+        n = self.count
+        if not n:
+            return
+        # Centre offsets per image are baked in, so each particle is one (image, pos) pair
+        img_idx = (self.frame[:n] // self.img_durations[self.kind[:n]]).tolist()
+        pos = (self.pos[:n] - offset).tolist()
+        surf.blits([(self.images[k][i], (x - self.half_sizes[k][i][0], y - self.half_sizes[k][i][1])) for (x, y), k, i in zip(pos, self.kind[:n].tolist(), img_idx)], doreturn=False)
\ No newline at end of file
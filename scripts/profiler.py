@@ -0,0 +1,116 @@
+import csv
+import json
+import time
+from collections import deque
+
+class FrameProfiler:
+    # Lap-style per-phase frame timings; every hook returns straight away while disabled
+    def __init__(self, window=240, trace_limit=200000):
+        self.enabled = False
+        self.overlay = False
+        self.window = window  # frames kept for the rolling percentiles
+        self.samples = {}
+        self.trace = deque(maxlen=trace_limit)  # (frame, phase, ms) rows for export; the oldest go past trace_limit
+        self.current = {}
+        self.counters = {}
+        self.frame = 0
+        self.last = 0
+        self.lines = []
+    
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self.frame += 1
+        self.current.clear()
+        self.last = time.perf_counter()
+    
+    def mark(self, phase):
+        # Charge the time since the previous mark to phase; repeated phases in a frame add up
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.current[phase] = self.current.get(phase, 0) + (now - self.last) * 1000
+        self.last = now
+    
+    def count(self, name, value):
+        # Running totals shown under the timings, e.g. cache redraws
+        if not self.enabled:
+            return
+        self.counters[name] = value
+    
+    def end_frame(self):
+        if not self.enabled:
+            return
+        total = 0
+        for phase, ms in self.current.items():
+            self.samples.setdefault(phase, deque(maxlen=self.window)).append(ms)
+            self.trace.append((self.frame, phase, ms))
+            total += ms
+        self.samples.setdefault('frame', deque(maxlen=self.window)).append(total)
+        self.trace.append((self.frame, 'frame', total))
+        
+        # Rebuilding the overlay text twice a second is plenty
+        if self.overlay and self.frame % 30 == 0:
+            self.lines = [('phase', 'p50', 'p95', 'p99')]
+            for phase, values in self.samples.items():
+                ordered = sorted(values)
+                self.lines.append((phase,) + tuple('%.2f' % ordered[min(len(ordered) - 1, int(len(ordered) * p))] for p in (0.5, 0.95, 0.99)))
+            for name, value in self.counters.items():
+                self.lines.append((name, '', '', str(value)))
+    
+    def toggle(self):
+        # The overlay implies collecting samples
+        self.overlay = not self.overlay
+        self.enabled = self.enabled or self.overlay
+    
+    def render(self, surf, font, col_width=30):
+        if not (self.overlay and self.lines):
+            return
+        # Phase names left-aligned, numbers right-aligned in fixed columns
+        width = col_width * 5
+        line_height = font.get_linesize()
+        x = surf.get_width() - width - 2
+        surf.fill((0, 0, 0), (x - 2, 2, width + 4, line_height * len(self.lines) + 4))
+        for row, line in enumerate(self.lines):
+            y = 4 + row * line_height
+            surf.blit(font.render(line[0], True, (255, 255, 255)), (x, y))
+            for col, value in enumerate(line[1:]):
+                text = font.render(value, True, (255, 255, 255))
+                surf.blit(text, (x + col_width * (col + 3) - text.get_width(), y))
+    
+    def export(self, path):
+        # CSV or JSON depending on the file extension
+        with open(path, 'w', newline='') as f:
+            if path.endswith('.json'):
+                json.dump([{'frame': frame, 'phase': phase, 'ms': ms} for frame, phase, ms in self.trace], f)
+            else:
+                writer = csv.writer(f)
+                writer.writerow(['frame', 'phase', 'ms'])
+                writer.writerows(self.trace)
+
+class StartupTimer:
+    # Time from launch to the first frame, split into the main thread's phases, plus the moments
+    # background loaders finish (their event() calls come from worker threads)
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.last = self.start
+        self.phases = []  # (phase, ms since the previous phase)
+        self.events = []  # (name, ms since start)
+    
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self.last) * 1000))
+        self.last = now
+    
+    def event(self, name):
+        self.events.append((name, (time.perf_counter() - self.start) * 1000))
+    
+    def report(self):
+        lines = ['%-18s %8s %8s' % ('phase', 'ms', 'at')]
+        at = 0
+        for phase, ms in self.phases:
+            at += ms
+            lines.append('%-18s %8.1f %8.1f' % (phase, ms, at))
+        for name, ms in self.events:
+            lines.append('%-18s %8s %8.1f' % ('[bg] ' + name, '', ms))
+        return '\n'.join(lines)
\ No newline at end of file
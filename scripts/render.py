@@ -0,0 +1,32 @@
+import pygame
+
+class RenderQueue:
+    # Collects sprite blits during a frame and submits them in one Surface.blits call
+    def __init__(self):
+        self.commands = []
+    
+    def blit(self, img, pos):
+        self.commands.append((img, pos))
+    
+    def blits(self, commands, doreturn=False):
+        self.commands.extend(commands)
+    
+    def flush(self, surf, outlines=None):
+        # Outlines go to their own layer first so they sit underneath
+        if self.commands:
+            if outlines:
+                outlines.blits(self.commands)
+            surf.blits(self.commands, doreturn=False)
+            self.commands.clear()
+
+def iris_masks(size, steps=30, step_px=8):
+    # Level transition frames, indexed by abs(transition): black with a keyed-out circle of radius
+    # (steps - i) * step_px. 8-bit surfaces blit the same as full colour ones at a quarter of the memory
+    masks = []
+    for i in range(steps + 1):
+        mask = pygame.Surface(size, depth=8)
+        mask.set_palette_at(1, (255, 255, 255))
+        pygame.draw.circle(mask, (255, 255, 255), (size[0]//2, size[1]//2), (steps - i) * step_px)
+        mask.set_colorkey((255, 255, 255))
+        masks.append(mask)
+    return masks
\ No newline at end of file
@@ -0,0 +1,52 @@
+import json
+
+# Input bits packed into one int per tick
+LEFT = 1
+RIGHT = 2
+JUMP = 4
+DASH = 8
+
+class InputLog:
+    # Per-tick player inputs for a seeded run, run-length encoded as [bits, ticks] pairs
+    def __init__(self, seed=0, path=None, wake_margin=None):
+        self.seed = seed
+        self.path = path
+        self.wake_margin = wake_margin  # enemy sleep distance the run was simulated with
+        self.runs = []
+        self.final_hash = None
+    
+    def __len__(self):
+        return sum(run[1] for run in self.runs)
+    
+    def record(self, movement, jump, dash):
+        bits = (LEFT if movement[0] else 0) | (RIGHT if movement[1] else 0) | (JUMP if jump else 0) | (DASH if dash else 0)
+        if self.runs and self.runs[-1][0] == bits:
+            self.runs[-1][1] += 1
+        else:
+            self.runs.append([bits, 1])
+    
+    def ticks(self):
+        # Yield (movement, jump, dash) for every recorded tick
+        for bits, count in self.runs:
+            inputs = ((bool(bits & LEFT), bool(bits & RIGHT)), bool(bits & JUMP), bool(bits & DASH))
+            for i in range(count):
+                yield inputs
+    
+    def finish(self, final_hash):
+        self.final_hash = final_hash
+        if self.path:
+            self.save(self.path)
+    
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({'version': 1, 'seed': self.seed, 'wake_margin': self.wake_margin, 'ticks': len(self), 'inputs': self.runs, 'final_hash': self.final_hash}, f)
+    
+    def load(self, path):
+        with open(path, 'r') as f:
+            log_data = json.load(f)
+        self.path = path
+        self.seed = log_data['seed']
+        # Logs from before enemies could sleep were simulated with every enemy awake
+        self.wake_margin = log_data.get('wake_margin')
+        self.runs = log_data['inputs']
+        self.final_hash = log_data.get('final_hash')
\ No newline at end of file
@@ -1,25 +1,59 @@
-import math
+import numpy as np
 import pygame
 
-class Ember:
-    # Small particle effect for sparks
-    def __init__(self, pos, angle, speed):
-        self.pos = list(pos)
-        self.ang = angle
-        self.spd = speed
+class SparkSystem:
+    # Fixed-capacity pool of sparks stored as parallel arrays
+    def __init__(self, capacity=2048):
+        self.capacity = capacity
+        self.count = 0
+        self.pos = np.zeros((capacity, 2))
+        self.ang = np.zeros(capacity)
+        self.spd = np.zeros(capacity)
+    
+    def __len__(self):
+        return self.count
+    
+    def clear(self):
+        self.count = 0
+    
+    def emit(self, pos, angle, speed):
+        # Silently drop effects once the pool is full
+        if self.count == self.capacity:
+            return
+        i = self.count
+        self.pos[i] = pos
+        self.ang[i] = angle
+        self.spd[i] = speed
+        self.count += 1
         
     def update(self):
-        self.pos[0] += math.cos(self.ang) * self.spd
-        self.pos[1] += math.sin(self.ang) * self.spd
-        self.spd = max(0, self.spd - 0.1)  # Slow down each frame
-        return not self.spd
+        n = self.count
+        if not n:
+            return
+        pos, ang, spd = self.pos[:n], self.ang[:n], self.spd[:n]
+        pos[:, 0] += np.cos(ang) * spd
+        pos[:, 1] += np.sin(ang) * spd
+        np.maximum(spd - 0.1, 0, out=spd)  # Slow down each frame
+        
+        # Compact live slots to the front of the pool
+        alive = spd > 0
+        if not alive.all():
+            keep = np.flatnonzero(alive)
+            m = len(keep)
+            self.pos[:m] = pos[keep]
+            self.ang[:m] = ang[keep]
+            self.spd[:m] = spd[keep]
+            self.count = m
     
     def render(self, surf, offset=(0, 0)):
-        # Polygon shape representing the ember
-        pts = [
-            (self.pos[0] + math.cos(self.ang)*self.spd*3 - offset[0], self.pos[1] + math.sin(self.ang)*self.spd*3 - offset[1]),
-            (self.pos[0] + math.cos(self.ang + math.pi*0.5)*self.spd*0.5 - offset[0], self.pos[1] + math.sin(self.ang + math.pi*0.5)*self.spd*0.5 - offset[1]),
-            (self.pos[0] + math.cos(self.ang + math.pi)*self.spd*3 - offset[0], self.pos[1] + math.sin(self.ang + math.pi)*self.spd*3 - offset[1]),
-            (self.pos[0] + math.cos(self.ang - math.pi*0.5)*self.spd*0.5 - offset[0], self.pos[1] + math.sin(self.ang - math.pi*0.5)*self.spd*0.5 - offset[1]),
-        ]
-        pygame.draw.polygon(surf, (255, 255, 255), pts)
\ No newline at end of file
+        n = self.count
+        if not n:
+            return
+        # Diamond shape along the direction of travel, all four points computed at once
+        pos = self.pos[:n] - offset
+        fwd = np.stack((np.cos(self.ang[:n]), np.sin(self.ang[:n])), axis=1) * self.spd[:n, None]
+        side = fwd[:, ::-1] * (-0.5, 0.5)
+        fwd *= 3
+        pts = np.stack((pos + fwd, pos + side, pos - fwd, pos - side), axis=1).tolist()
+        for poly in pts:
+            pygame.draw.polygon(surf, (255, 255, 255), poly)
\ No newline at end of file
@@ -0,0 +1,72 @@
+import pygame
+
+class SpatialHash:
+    # Uniform grid of buckets for broad-phase overlap and radius queries
+    def __init__(self, cell_size=32):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.items = {}  # id(obj) -> [obj, rect, cell span]
+    
+    def span(self, rect):
+        cs = self.cell_size
+        return (rect.left // cs, rect.top // cs, (rect.right - 1) // cs, (rect.bottom - 1) // cs)
+    
+    def insert(self, obj, rect):
+        span = self.span(rect)
+        self.items[id(obj)] = [obj, pygame.Rect(rect), span]
+        for cx in range(span[0], span[2] + 1):
+            for cy in range(span[1], span[3] + 1):
+                cell = self.cells.get((cx, cy))
+                if cell is None:
+                    cell = self.cells[(cx, cy)] = {}
+                cell[id(obj)] = obj
+    
+    def remove(self, obj):
+        item = self.items.pop(id(obj), None)
+        if not item:
+            return
+        span = item[2]
+        for cx in range(span[0], span[2] + 1):
+            for cy in range(span[1], span[3] + 1):
+                cell = self.cells[(cx, cy)]
+                del cell[id(obj)]
+                if not cell:
+                    del self.cells[(cx, cy)]
+    
+    def move(self, obj, rect):
+        # Only re-bucket when the object crosses into different cells
+        item = self.items[id(obj)]
+        span = self.span(rect)
+        if span == item[2]:
+            item[1].update(rect)
+        else:
+            self.remove(obj)
+            self.insert(obj, rect)
+    
+    def query(self, rect):
+        # Objects whose stored rect overlaps rect, each listed once
+        found = {}
+        items = self.items
+        cs = self.cell_size
+        for cx in range(rect.left // cs, (rect.right - 1) // cs + 1):
+            for cy in range(rect.top // cs, (rect.bottom - 1) // cs + 1):
+                cell = self.cells.get((cx, cy))
+                if cell:
+                    for key in cell:
+                        if key not in found and items[key][1].colliderect(rect):
+                            found[key] = items[key][0]
+        return list(found.values())
+    
+    def query_radius(self, pos, radius):
+        # Objects whose stored rect comes within radius of pos
+        found = []
+        for obj in self.query(pygame.Rect(pos[0] - radius, pos[1] - radius, radius * 2, radius * 2)):
+            r = self.items[id(obj)][1]
+            dx = pos[0] - max(r.left, min(pos[0], r.right))
+            dy = pos[1] - max(r.top, min(pos[1], r.bottom))
+            if dx * dx + dy * dy <= radius * radius:
+                found.append(obj)
+        return found
+    
+    def __len__(self):
+        return len(self.items)
\ No newline at end of file
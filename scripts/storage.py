@@ -0,0 +1,71 @@
+import os
+import json
+import time
+import threading
+
+class SaveFile:
+    # Small JSON save file, rewritten on a background thread only when a value changes
+    def __init__(self, path, delay=0.5):
+        # A path of None keeps the data in memory only (e.g. headless runs)
+        self.path = path
+        self.delay = delay  # seconds to coalesce bursts of changes into one write
+        self.data = self.read()
+        self.pending = None
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = None
+    
+    def read(self):
+        if not self.path:
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+    
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+    
+    def set(self, key, value):
+        if self.data.get(key) == value:
+            return
+        self.data[key] = value
+        if not self.path:
+            return
+        with self.lock:
+            self.pending = json.dumps(self.data)
+        if not self.thread:
+            self.thread = threading.Thread(target=self.worker, daemon=True)
+            self.thread.start()
+        self.wake.set()
+    
+    def worker(self):
+        while True:
+            self.wake.wait()
+            self.wake.clear()
+            if self.delay:
+                time.sleep(self.delay)
+            self.write_pending()
+    
+    def write_pending(self):
+        # Taking the text under write_lock means a caller that finds nothing pending has still
+        # waited for any write already in flight
+        with self.write_lock:
+            with self.lock:
+                text, self.pending = self.pending, None
+            if text is None:
+                return
+            # Write next to the target and rename over it, so a crash never leaves a truncated file
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+    
+    def flush(self):
+        # Write any pending change now, on the calling thread, and wait for one the worker is writing
+        if self.path:
+            self.write_pending()
\ No newline at end of file
@@ -1,6 +1,15 @@
+import sys
+import math
 import json
+import random
+import itertools
+import numpy as np
 import pygame
 
+from scripts.spatial import SpatialHash
+
+from scripts.mapformat import MapFile, write_map, type_mask
+
 # Define autotiling patterns
 AUTOTILE_MAP = {
     tuple(sorted([(1, 0), (0, 1)])): 0,
@@ -14,9 +23,16 @@ AUTOTILE_MAP = {
     tuple(sorted([(1, 0), (-1, 0), (0, 1), (0, -1)])): 8,
 }
 
+# Autotile neighbour masks: bit n is set when the tile at AUTOTILE_BITS[n] has the same type
+AUTOTILE_BITS = ((1, 0), (-1, 0), (0, -1), (0, 1))
+AUTOTILE_VARIANTS = [AUTOTILE_MAP.get(tuple(sorted(shift for bit, shift in enumerate(AUTOTILE_BITS) if mask & (1 << bit)))) for mask in range(16)]
+AUTOTILE_LUT = np.array([-1 if v is None else v for v in AUTOTILE_VARIANTS])
+
 NEIGHBOR_OFFSETS = [(-1, 0), (-1, -1), (0, -1), (1, -1), (1, 0), (0, 0), (-1, 1), (0, 1), (1, 1)]
 PHYSICS_TILES = {'grass', 'stone'}
 AUTOTILE_TYPES = {'grass', 'stone'}
+CHUNK_SIZE = 16  # chunk width/height in tiles
+CHUNK_KEEP = 2  # chunks kept around the view; baked surfaces and re-decodable tiles further out are dropped
 
 class WorldMap:
     # Manages tile-based world structure
@@ -24,90 +40,520 @@ class WorldMap:
         self.game = game
         self.tile_size = tile_size
         self.tilemap = {}
-        self.offgrid_tiles = []
+        # Offgrid tiles keyed by insertion number, so removal is O(1) while keeping draw order
+        self.offgrid_tiles = {}
+        self.offgrid_keys = {}  # id(tile) -> key in offgrid_tiles
+        self.offgrid_next = 0
+        self.offgrid_grid = None  # spatial hash over offgrid images, built on first offgrid_in()
+        
+        # (type, variant) -> {loc: tile} and {id: tile}, so extract only visits matches
+        self.tile_index = {}
+        self.offgrid_index = {}
+        
+        # Chunks of a binary map that have not been decoded into self.tilemap yet, and decoded ones
+        # that are unmodified apart from removals, so they can be dropped and decoded again from the file
+        self.map_file = None
+        self.lazy_chunks = set()
+        self.decoded_chunks = set()
+        self.removed = {}  # chunk -> locations of file tiles removed since loading, skipped when decoding
+        
+        # Baked chunk surfaces, None for chunks with nothing to draw
+        self.chunked = True
+        self.chunk_cache = {}
+        self.view_chunks = None  # chunk range of the last render, to evict only when it changes
         
+        # Dense solidity bitmap over the map bounds, and per cell the collision rects around it
+        self.solid_origin = (0, 0)
+        self.solid_size = (0, 0)
+        self.solid = bytearray()
+        self.solid_rects = []
+    
     def extract(self, id_pairs, keep=False):
         # Extract tiles by type and variant
         matches = []
-        for t in self.offgrid_tiles.copy():
-            if (t['type'], t['variant']) in id_pairs:
+        searched = []
+        if self.lazy_chunks:
+            mask = type_mask(self.map_file.type_ids, {pair[0] for pair in id_pairs})
+            for chunk in list(self.lazy_chunks):
+                if self.map_file.chunks[chunk][0] & mask:
+                    self.decode_chunk(chunk)
+                    searched.append(chunk)
+        
+        for pair in id_pairs:
+            for t in list(self.offgrid_index.get(pair, {}).values()):
                 matches.append(t.copy())
                 if not keep:
-                    self.offgrid_tiles.remove(t)
-        
-        for loc in list(self.tilemap.keys()):
-            tile = self.tilemap[loc]
-            if (tile['type'], tile['variant']) in id_pairs:
-                new_copy = tile.copy()
-                new_copy['pos'] = new_copy['pos'].copy()
-                new_copy['pos'][0] *= self.tile_size
-                new_copy['pos'][1] *= self.tile_size
-                matches.append(new_copy)
-                if not keep:
-                    del self.tilemap[loc]
+                    self.remove_offgrid(t)
         
+        # Position order keeps results identical whichever format the map was loaded from
+        for loc in sorted(loc for pair in id_pairs for loc in self.tile_index.get(pair, ())):
+            new_copy = self.tilemap[loc].copy()
+            new_copy['pos'] = new_copy['pos'].copy()
+            new_copy['pos'][0] *= self.tile_size
+            new_copy['pos'][1] *= self.tile_size
+            matches.append(new_copy)
+            if not keep:
+                self.remove_tile(loc)
+        
+        # Chunks decoded only to be searched go back to the file, so pulling out objects keeps no terrain resident
+        for chunk in searched:
+            if chunk in self.decoded_chunks:
+                self.forget_chunk(chunk)
         return matches
 
+    def bounds(self):
+        # Grid extent (min_x, min_y, max_x, max_y), or None for a map without grid tiles
+        self.decode_all()
+        if not self.tilemap:
+            return None
+        xs = [loc[0] for loc in self.tilemap]
+        ys = [loc[1] for loc in self.tilemap]
+        return (min(xs), min(ys), max(xs), max(ys))
+    
     def tiles_around(self, pos):
         found = []
-        tloc = (int(pos[0] // self.tile_size), int(pos[1] // self.tile_size))
-        for off in NEIGHBOR_OFFSETS:
-            check_loc = str(tloc[0] + off[0]) + ';' + str(tloc[1] + off[1])
-            if check_loc in self.tilemap:
-                found.append(self.tilemap[check_loc])
+        tx, ty = int(pos[0] // self.tile_size), int(pos[1] // self.tile_size)
+        for ox, oy in NEIGHBOR_OFFSETS:
+            tile = self.get_tile((tx + ox, ty + oy))
+            if tile:
+                found.append(tile)
         return found
     
+    def get_tile(self, loc):
+        if self.lazy_chunks:
+            self.decode_chunk((loc[0] // CHUNK_SIZE, loc[1] // CHUNK_SIZE))
+        return self.tilemap.get(loc)
+    
+    def decode_chunk(self, chunk):
+        # Turn one pending chunk of a binary map into tile dicts
+        if chunk not in self.lazy_chunks:
+            return
+        self.lazy_chunks.remove(chunk)
+        self.decoded_chunks.add(chunk)
+        removed = self.removed.get(chunk, ())
+        for loc, tile_type, variant in self.map_file.chunk_tiles(chunk):
+            if loc in removed:
+                continue
+            self.tilemap[loc] = {'type': tile_type, 'variant': variant, 'pos': [loc[0], loc[1]]}
+            self.index_tile(loc, self.tilemap[loc])
+        if not self.lazy_chunks:
+            self.close_map_file()
+    
+    def forget_chunk(self, chunk):
+        # Undo decode_chunk for a chunk nothing but removals has changed since
+        self.decoded_chunks.remove(chunk)
+        removed = self.removed.get(chunk, ())
+        for loc, tile_type, variant in self.map_file.chunk_tiles(chunk):
+            if loc not in removed:
+                self.unindex_tile(loc, self.tilemap.pop(loc))
+        self.lazy_chunks.add(chunk)
+    
+    def decode_all(self):
+        for chunk in list(self.lazy_chunks):
+            self.decode_chunk(chunk)
+    
+    def close_map_file(self):
+        self.lazy_chunks = set()
+        self.decoded_chunks = set()
+        self.removed = {}
+        if self.map_file:
+            self.map_file.close()
+            self.map_file = None
+    
     def save(self, path):
+        self.decode_all()
+        if path.endswith('.bjm'):
+            return write_map(path, self.tilemap, self.offgrid_list(), self.tile_size, CHUNK_SIZE)
         with open(path, 'w') as f:
-            json.dump({'tilemap': self.tilemap, 'tile_size': self.tile_size, 'offgrid': self.offgrid_tiles}, f)
+            # Keys are stored as "x;y" strings on disk
+            tilemap = {str(loc[0]) + ';' + str(loc[1]): tile for loc, tile in self.tilemap.items()}
+            json.dump({'tilemap': tilemap, 'tile_size': self.tile_size, 'offgrid': self.offgrid_list()}, f)
         
     def load(self, path):
+        self.close_map_file()
+        self.chunk_cache = {}
+        self.view_chunks = None
+        if path.endswith('.bjm'):
+            # Binary maps only read the chunk index now; tiles are decoded as they are touched
+            self.map_file = MapFile(path)
+            self.tilemap = {}
+            self.tile_size = self.map_file.tile_size
+            self.set_offgrid(self.map_file.offgrid_tiles())
+            self.reindex()
+            self.lazy_chunks = set(self.map_file.chunks)
+            if self.map_file.chunk_size != CHUNK_SIZE:
+                self.decode_all()
+            self.build_solidity()
+            return
+        
         with open(path, 'r') as f:
             map_data = json.load(f)
-        self.tilemap = map_data['tilemap']
+        self.tilemap = {}
+        for loc, tile in map_data['tilemap'].items():
+            x, y = loc.split(';')
+            self.tilemap[(int(x), int(y))] = tile
         self.tile_size = map_data['tile_size']
-        self.offgrid_tiles = map_data['offgrid']
+        self.set_offgrid(map_data['offgrid'])
+        self.reindex()
+        self.build_solidity()
+    
+    def remove_tile(self, loc):
+        tile = self.get_tile(loc)
+        self.apply({loc: None})
+        return tile
+    
+    def apply(self, changes):
+        # Set many grid tiles at once (None removes), rebaking only touched chunks and resizing
+        # the solidity bitmap at most once; returns the changes that would undo this
+        undo = {}
+        rebuild = False
+        for loc, tile in changes.items():
+            old = self.get_tile(loc)
+            if old == tile:
+                continue
+            undo[loc] = old
+            # A removal is remembered so the chunk can still be decoded again; any other edit keeps
+            # the chunk decoded for good, since the file no longer matches it
+            chunk = (loc[0] // CHUNK_SIZE, loc[1] // CHUNK_SIZE)
+            if tile is None and chunk in self.decoded_chunks:
+                self.removed.setdefault(chunk, set()).add(loc)
+            else:
+                self.decoded_chunks.discard(chunk)
+            if old:
+                self.invalidate(old)
+                self.unindex_tile(loc, old)
+                del self.tilemap[loc]
+            if tile:
+                self.tilemap[loc] = tile
+                self.index_tile(loc, tile)
+                self.invalidate(tile)
+            rebuild = self.update_solidity(loc, rebuild=False) or rebuild
+        if rebuild:
+            self.build_solidity(margin=CHUNK_SIZE)
+        return undo
+    
+    def add_offgrid(self, tile, key=None):
+        # key puts a tile back at its old place in the draw order (undo); returns the key used
+        if key is None:
+            key = self.offgrid_next
+            self.offgrid_next += 1
+        self.offgrid_tiles[key] = tile
+        self.offgrid_keys[id(tile)] = key
+        self.offgrid_index.setdefault((tile['type'], tile['variant']), {})[key] = tile
+        if self.offgrid_grid:
+            self.offgrid_grid.insert(tile, self.tile_rect(tile, ongrid=False))
+        self.invalidate(tile, ongrid=False)
+        return key
+    
+    def remove_offgrid(self, tile):
+        key = self.offgrid_keys.pop(id(tile))
+        del self.offgrid_tiles[key]
+        self.offgrid_index[(tile['type'], tile['variant'])].pop(key, None)
+        if self.offgrid_grid:
+            self.offgrid_grid.remove(tile)
+        self.invalidate(tile, ongrid=False)
+        return key
+    
+    def set_offgrid(self, tiles):
+        self.offgrid_tiles = dict(enumerate(tiles))
+        self.offgrid_keys = {id(tile): key for key, tile in self.offgrid_tiles.items()}
+        self.offgrid_next = len(self.offgrid_tiles)
+        self.offgrid_grid = None
+    
+    def offgrid_list(self):
+        # Offgrid tiles in draw order
+        return [tile for key, tile in sorted(self.offgrid_tiles.items())]
+    
+    def offgrid_in(self, rect):
+        # Offgrid tiles whose image overlaps a pixel rect, in draw order
+        if self.offgrid_grid is None:
+            self.offgrid_grid = SpatialHash(cell_size=64)
+            for tile in self.offgrid_tiles.values():
+                self.offgrid_grid.insert(tile, self.tile_rect(tile, ongrid=False))
+        tiles = self.offgrid_grid.query(rect)
+        tiles.sort(key=lambda tile: self.offgrid_keys[id(tile)])
+        return tiles
+    
+    def index_tile(self, loc, tile):
+        self.tile_index.setdefault((tile['type'], tile['variant']), {})[loc] = tile
+    
+    def unindex_tile(self, loc, tile):
+        entries = self.tile_index.get((tile['type'], tile['variant']))
+        if entries:
+            entries.pop(loc, None)
+    
+    def reindex(self):
+        # Rebuild both (type, variant) indexes, e.g. after variants were changed in place
+        self.tile_index = {}
+        self.offgrid_index = {}
+        for index, tiles in ((self.tile_index, self.tilemap), (self.offgrid_index, self.offgrid_tiles)):
+            for key, tile in tiles.items():
+                pair = (tile['type'], tile['variant'])
+                if pair in index:
+                    index[pair][key] = tile
+                else:
+                    index[pair] = {key: tile}
+    
+    def tile_rect(self, tile, ongrid=True):
+        # Pixel area covered by a tile's image. Fractional offgrid positions are floored once here,
+        # so a sprite straddling a chunk seam lands on the same pixels in both chunks
+        scale = self.tile_size if ongrid else 1
+        x, y = math.floor(tile['pos'][0] * scale), math.floor(tile['pos'][1] * scale)
+        imgs = self.game.assets.get(tile['type'])
+        if imgs and tile['variant'] < len(imgs):
+            img = imgs[tile['variant']]
+            return pygame.Rect(x, y, img.get_width(), img.get_height())
+        return pygame.Rect(x, y, self.tile_size, self.tile_size)
+    
+    def invalidate(self, tile, ongrid=True):
+        # Drop every baked chunk the tile's image touches
+        r = self.tile_rect(tile, ongrid)
+        c_px = CHUNK_SIZE * self.tile_size
+        for cx in range(r.left // c_px, (r.right - 1) // c_px + 1):
+            for cy in range(r.top // c_px, (r.bottom - 1) // c_px + 1):
+                self.chunk_cache.pop((cx, cy), None)
         
+    def build_solidity(self, margin=0):
+        # Rebuild the bitmap to cover every physics tile, plus some slack for editing
+        locs = [loc for loc, t in self.tilemap.items() if t['type'] in PHYSICS_TILES]
+        
+        # Pending binary chunks count by their whole chunk area
+        lazy = []
+        if self.lazy_chunks:
+            mask = type_mask(self.map_file.type_ids, PHYSICS_TILES)
+            lazy = [chunk for chunk in self.lazy_chunks if self.map_file.chunks[chunk][0] & mask]
+        corners = locs + [(cx * CHUNK_SIZE, cy * CHUNK_SIZE) for cx, cy in lazy] + [(cx * CHUNK_SIZE + CHUNK_SIZE - 1, cy * CHUNK_SIZE + CHUNK_SIZE - 1) for cx, cy in lazy]
+        if corners:
+            min_x = min(loc[0] for loc in corners) - margin
+            min_y = min(loc[1] for loc in corners) - margin
+            self.solid_origin = (min_x, min_y)
+            self.solid_size = (max(loc[0] for loc in corners) + margin + 1 - min_x, max(loc[1] for loc in corners) + margin + 1 - min_y)
+        else:
+            self.solid_origin = (0, 0)
+            self.solid_size = (0, 0)
+        self.solid = bytearray(self.solid_size[0] * self.solid_size[1])
+        self.solid_rects = [None] * len(self.solid)
+        ox, oy = self.solid_origin
+        for loc in locs:
+            self.solid[(loc[1] - oy) * self.solid_size[0] + loc[0] - ox] = 1
+        
+        if lazy:
+            grid = np.frombuffer(self.solid, dtype=np.uint8).reshape(self.solid_size[1], self.solid_size[0])
+            physics_ids = [self.map_file.type_ids[name] for name in PHYSICS_TILES if name in self.map_file.type_ids]
+            for cx, cy in lazy:
+                types = np.frombuffer(self.map_file.chunk_types((cx, cy)), dtype=np.uint8).reshape(CHUNK_SIZE, CHUNK_SIZE)
+                x, y = cx * CHUNK_SIZE - self.solid_origin[0], cy * CHUNK_SIZE - self.solid_origin[1]
+                grid[y:y + CHUNK_SIZE, x:x + CHUNK_SIZE] = np.isin(types, physics_ids)
+                for loc in self.removed.get((cx, cy), ()):
+                    grid[loc[1] - self.solid_origin[1], loc[0] - self.solid_origin[0]] = 0
+    
+    def update_solidity(self, loc, rebuild=True):
+        # Returns True when a solid tile landed outside the bitmap and it needs (or got) a rebuild
+        tile = self.tilemap.get(loc)
+        solid = bool(tile) and tile['type'] in PHYSICS_TILES
+        x, y = loc[0] - self.solid_origin[0], loc[1] - self.solid_origin[1]
+        if not (0 <= x < self.solid_size[0] and 0 <= y < self.solid_size[1]):
+            if solid and rebuild:
+                self.build_solidity(margin=CHUNK_SIZE)
+            return solid
+        w, h = self.solid_size
+        self.solid[y * w + x] = solid
+        # Every cell whose neighbourhood includes this one has stale rects now
+        for ox, oy in NEIGHBOR_OFFSETS:
+            if 0 <= x + ox < w and 0 <= y + oy < h:
+                self.solid_rects[(y + oy) * w + x + ox] = None
+    
     def solid_check(self, pos):
         # Check if a position collides with a solid tile
-        tile_loc = str(int(pos[0] // self.tile_size)) + ';' + str(int(pos[1] // self.tile_size))
-        if tile_loc in self.tilemap:
-            if self.tilemap[tile_loc]['type'] in PHYSICS_TILES:
-                return self.tilemap[tile_loc]
+        x = int(pos[0] // self.tile_size) - self.solid_origin[0]
+        y = int(pos[1] // self.tile_size) - self.solid_origin[1]
+        if 0 <= x < self.solid_size[0] and 0 <= y < self.solid_size[1] and self.solid[y * self.solid_size[0] + x]:
+            return self.get_tile((x + self.solid_origin[0], y + self.solid_origin[1]))
     
     def physics_rects_around(self, pos):
-        rects = []
-        for t in self.tiles_around(pos):
-            if t['type'] in PHYSICS_TILES:
-                rects.append(pygame.Rect(t['pos'][0]*self.tile_size, t['pos'][1]*self.tile_size, self.tile_size, self.tile_size))
+        # Rects of the solid tiles around pos, built once per cell; the tuple is shared, so never modify it
+        w, h = self.solid_size
+        x = int(pos[0] // self.tile_size) - self.solid_origin[0]
+        y = int(pos[1] // self.tile_size) - self.solid_origin[1]
+        if not (0 <= x < w and 0 <= y < h):
+            return self.rects_near(x, y)
+        rects = self.solid_rects[y * w + x]
+        if rects is None:
+            rects = self.solid_rects[y * w + x] = self.rects_near(x, y)
         return rects
     
-    def autotile(self):
-        # Autotile logic based on neighbors
-        for loc in self.tilemap:
-            tile = self.tilemap[loc]
-            neighbors = set()
-            for shift in [(1, 0), (-1, 0), (0, -1), (0, 1)]:
-                c_loc = str(tile['pos'][0] + shift[0]) + ';' + str(tile['pos'][1] + shift[1])
-                if c_loc in self.tilemap and self.tilemap[c_loc]['type'] == tile['type']:
-                    neighbors.add(shift)
-            neighbors = tuple(sorted(neighbors))
-            if (tile['type'] in AUTOTILE_TYPES) and (neighbors in AUTOTILE_MAP):
-                tile['variant'] = AUTOTILE_MAP[neighbors]
+    def rects_near(self, x, y):
+        # x, y are bitmap coordinates and may lie just outside it
+        w, h = self.solid_size
+        rects = []
+        for ox, oy in NEIGHBOR_OFFSETS:
+            nx, ny = x + ox, y + oy
+            if 0 <= nx < w and 0 <= ny < h and self.solid[ny * w + nx]:
+                rects.append(pygame.Rect((nx + self.solid_origin[0]) * self.tile_size, (ny + self.solid_origin[1]) * self.tile_size, self.tile_size, self.tile_size))
+        return tuple(rects)
+    
+    def autotile(self, dirty=None):
+        # Pick variants from same-type neighbours; with dirty locations only those and their neighbours are redone.
+        # Returns the old tiles of everything it changed, like apply()
+        if dirty is not None:
+            return self.autotile_locs({(loc[0] + shift[0], loc[1] + shift[1]) for loc in dirty for shift in ((0, 0),) + AUTOTILE_BITS})
+        
+        self.decode_all()
+        undo = {}
+        for tile_type in AUTOTILE_TYPES:
+            locs = [loc for key, entries in self.tile_index.items() if key[0] == tile_type for loc in entries]
+            if not locs:
+                continue
+            # Occupancy grid of this type with a one tile border, so neighbour lookups never go out of range
+            coords = np.fromiter(itertools.chain.from_iterable(locs), dtype=np.int64, count=len(locs) * 2).reshape(-1, 2)
+            xs = coords[:, 0] - coords[:, 0].min() + 1
+            ys = coords[:, 1] - coords[:, 1].min() + 1
+            grid = np.zeros((ys.max() + 2, xs.max() + 2), dtype=np.uint8)
+            grid[ys, xs] = 1
+            masks = grid[ys, xs + 1] | grid[ys, xs - 1] << 1 | grid[ys - 1, xs] << 2 | grid[ys + 1, xs] << 3
+            for loc, variant in zip(locs, AUTOTILE_LUT[masks].tolist()):
+                tile = self.tilemap[loc]
+                if variant >= 0 and variant != tile['variant']:
+                    undo[loc] = dict(tile)
+                    self.unindex_tile(loc, tile)
+                    tile['variant'] = variant
+                    self.index_tile(loc, tile)
+        # Rebake only the chunks under changed tiles, covering both the old and the new image
+        for loc, old in undo.items():
+            self.invalidate(old)
+            self.invalidate(self.tilemap[loc])
+        return undo
+    
+    def autotile_locs(self, locs):
+        changes = {}
+        for loc in locs:
+            tile = self.get_tile(loc)
+            if not tile or tile['type'] not in AUTOTILE_TYPES:
+                continue
+            mask = 0
+            for bit, shift in enumerate(AUTOTILE_BITS):
+                other = self.get_tile((loc[0] + shift[0], loc[1] + shift[1]))
+                if other and other['type'] == tile['type']:
+                    mask |= 1 << bit
+            variant = AUTOTILE_VARIANTS[mask]
+            if variant is not None and variant != tile['variant']:
+                changes[loc] = dict(tile, variant=variant)
+        return self.apply(changes)
+    
+    def bake_chunk(self, chunk):
+        # Pre-render every tile overlapping the chunk into one surface
+        c_px = CHUNK_SIZE * self.tile_size
+        c_rect = pygame.Rect(chunk[0]*c_px, chunk[1]*c_px, c_px, c_px)
+        surf = pygame.Surface((c_px, c_px), pygame.SRCALPHA)
+        drawn = False
+        if self.lazy_chunks:
+            for neighbor in [(0, 0), (-1, 0), (0, -1), (-1, -1)]:
+                self.decode_chunk((chunk[0] + neighbor[0], chunk[1] + neighbor[1]))
+        
+        for tile in self.offgrid_in(c_rect):
+            r = self.tile_rect(tile, ongrid=False)
+            surf.blit(self.game.assets[tile['type']][tile['variant']], (r.x - c_rect.x, r.y - c_rect.y))
+            drawn = True
+        
+        # Grid tiles from the chunk above/left can hang over into this one
+        for x in range((chunk[0] - 1) * CHUNK_SIZE, (chunk[0] + 1) * CHUNK_SIZE):
+            for y in range((chunk[1] - 1) * CHUNK_SIZE, (chunk[1] + 1) * CHUNK_SIZE):
+                t = self.tilemap.get((x, y))
+                if t:
+                    r = self.tile_rect(t)
+                    if r.colliderect(c_rect):
+                        surf.blit(self.game.assets[t['type']][t['variant']], (r.x - c_rect.x, r.y - c_rect.y))
+                        drawn = True
+        return surf if drawn else None
 
-    def render(self, surf, offset=(0, 0)):
-        # Draw offgrid tiles first
-        for tile in self.offgrid_tiles:
-            surf.blit(self.game.assets[tile['type']][tile['variant']], (tile['pos'][0]-offset[0], tile['pos'][1]-offset[1]))
+    def prebake(self, area):
+        # Bake the chunks overlapping a pixel area ahead of the first frame that shows them
+        c_px = CHUNK_SIZE * self.tile_size
+        for cx in range(area.left // c_px, (area.right - 1) // c_px + 1):
+            for cy in range(area.top // c_px, (area.bottom - 1) // c_px + 1):
+                if (cx, cy) not in self.chunk_cache:
+                    self.chunk_cache[(cx, cy)] = self.bake_chunk((cx, cy))
+    
+    def evict(self, view, margin=CHUNK_KEEP):
+        # Drop baked surfaces, and tiles a binary map can decode again, for chunks more than margin
+        # chunks outside view (min_cx, min_cy, max_cx, max_cy). Their outlines go with the surfaces
+        def far(chunk):
+            return not (view[0] - margin <= chunk[0] <= view[2] + margin and view[1] - margin <= chunk[1] <= view[3] + margin)
+        for chunk in [chunk for chunk in self.chunk_cache if far(chunk)]:
+            del self.chunk_cache[chunk]
+        if self.map_file:
+            for chunk in [chunk for chunk in self.decoded_chunks if far(chunk)]:
+                self.forget_chunk(chunk)
+    
+    def render(self, surf, offset=(0, 0), outlines=None):
+        if not self.chunked:
+            return self.render_tiles(surf, offset=offset, outlines=outlines)
         
-        # Then draw main tilemap
-        start_x = offset[0] // self.tile_size
+        # Blit only the baked chunks overlapping the camera
+        c_px = CHUNK_SIZE * self.tile_size
+        view = (offset[0] // c_px, offset[1] // c_px, (offset[0] + surf.get_width() - 1) // c_px, (offset[1] + surf.get_height() - 1) // c_px)
+        if view != self.view_chunks:
+            self.view_chunks = view
+            self.evict(view)
+        for cx in range(view[0], view[2] + 1):
+            for cy in range(view[1], view[3] + 1):
+                if (cx, cy) not in self.chunk_cache:
+                    self.chunk_cache[(cx, cy)] = self.bake_chunk((cx, cy))
+                chunk_surf = self.chunk_cache[(cx, cy)]
+                if chunk_surf:
+                    surf.blit(chunk_surf, (cx*c_px - offset[0], cy*c_px - offset[1]))
+                    if outlines:
+                        outlines.blit(chunk_surf, (cx*c_px - offset[0], cy*c_px - offset[1]))
+    
+    def render_tiles(self, surf, offset=(0, 0), outlines=None):
+        # Draw offgrid tiles first, at the same floored positions the chunks bake them at
+        for tile in self.offgrid_list():
+            r = self.tile_rect(tile, ongrid=False)
+            surf.blit(self.game.assets[tile['type']][tile['variant']], (r.x - offset[0], r.y - offset[1]))
+            if outlines:
+                outlines.blit(self.game.assets[tile['type']][tile['variant']], (r.x - offset[0], r.y - offset[1]))
+        
+        # Then draw main tilemap, starting a tile early for images taller or wider than a tile
+        start_x = offset[0] // self.tile_size - 1
         end_x = (offset[0] + surf.get_width()) // self.tile_size + 1
-        start_y = offset[1] // self.tile_size
+        start_y = offset[1] // self.tile_size - 1
         end_y = (offset[1] + surf.get_height()) // self.tile_size + 1
+        for cx in range(start_x // CHUNK_SIZE, end_x // CHUNK_SIZE + 1):
+            for cy in range(start_y // CHUNK_SIZE, end_y // CHUNK_SIZE + 1):
+                self.decode_chunk((cx, cy))
         for x in range(start_x, end_x):
             for y in range(start_y, end_y):
-                loc = str(x) + ';' + str(y)
-                if loc in self.tilemap:
-                    t = self.tilemap[loc]
-                    surf.blit(self.game.assets[t['type']][t['variant']], (t['pos'][0]*self.tile_size - offset[0], t['pos'][1]*self.tile_size - offset[1]))
\ No newline at end of file
+                t = self.tilemap.get((x, y))
+                if t:
+                    surf.blit(self.game.assets[t['type']][t['variant']], (t['pos'][0]*self.tile_size - offset[0], t['pos'][1]*self.tile_size - offset[1]))
+                    if outlines:
+                        outlines.blit(self.game.assets[t['type']][t['variant']], (t['pos'][0]*self.tile_size - offset[0], t['pos'][1]*self.tile_size - offset[1]))
+
+if __name__ == '__main__':
+    # Render check: python -m scripts.tilemap data/maps/*.json draws random views of each map both
+    # from baked chunks and tile by tile, and fails if any view differs by a single pixel
+    from types import SimpleNamespace
+    from scripts.utils import fetch_images
+    assets = {t: fetch_images('tiles/' + t) for t in ('decor', 'grass', 'large_decor', 'stone', 'spawners', 'coin')}
+    assets['doors'] = fetch_images('tiles/door', size=(16, 20))
+    game = SimpleNamespace(assets=assets)
+    rng = random.Random(0)
+    failed = 0
+    for path in sys.argv[1:]:
+        tilemap = WorldMap(game)
+        tilemap.load(path)
+        min_x, min_y, max_x, max_y = tilemap.bounds()
+        chunked = pygame.Surface((320, 240), pygame.SRCALPHA)
+        tiles = pygame.Surface((320, 240), pygame.SRCALPHA)
+        diffs = 0
+        for i in range(200):
+            offset = (rng.randint(min_x * tilemap.tile_size - 320, max_x * tilemap.tile_size), rng.randint(min_y * tilemap.tile_size - 240, max_y * tilemap.tile_size))
+            chunked.fill((0, 0, 0, 0))
+            tiles.fill((0, 0, 0, 0))
+            tilemap.render(chunked, offset=offset)
+            tilemap.render_tiles(tiles, offset=offset)
+            if pygame.image.tobytes(chunked, 'RGBA') != pygame.image.tobytes(tiles, 'RGBA'):
+                diffs += 1
+        print(path, 'views differing: %d of 200' % diffs)
+        failed += diffs
+    sys.exit(1 if failed else 0)
\ No newline at end of file
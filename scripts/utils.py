@@ -1,41 +1,58 @@
 import os
+import random
 import pygame
 
+from scripts.assets import ImageCache
+
 # Adjust base path as needed
 BASE_IMG_PATH = 'data/images/'
+IMAGE_CACHE_PATH = 'data/cache/images.bin'
+
+# Decoded images persist between runs here; call image_cache.save() once the assets are loaded
+image_cache = ImageCache(BASE_IMG_PATH, IMAGE_CACHE_PATH)
+
+# One RNG stream per subsystem, so cosmetic draws never shift gameplay
+RNG_STREAMS = ('ai', 'fx', 'leaves', 'clouds', 'shake')
 
-def fetch_image(path):
-    # Load a single image with transparency
-    img = pygame.image.load(BASE_IMG_PATH + path).convert()
+def fetch_image(path, alpha=False, size=None):
+    # Load a single image with transparency, optionally scaled to size
+    img = image_cache.get(path, size)
+    if alpha:
+        return img.convert_alpha() if pygame.display.get_surface() else img.copy()
+    # Headless runs have no display to convert to; copy so the cached image keeps no colorkey
+    img = img.convert() if pygame.display.get_surface() else img.copy()
     img.set_colorkey((0, 0, 0))
     return img
 
-def fetch_images(path):
+def fetch_images(path, size=None):
     # Load multiple images from a directory
     imgs = []
     for img_name in sorted(os.listdir(BASE_IMG_PATH + path)):
-        imgs.append(fetch_image(path + '/' + img_name))
+        imgs.append(fetch_image(path + '/' + img_name, size=size))
     return imgs
 
+def make_rngs(seed):
+    # String seeds hash the same on every run and platform
+    return {name: random.Random(str(seed) + ':' + name) for name in RNG_STREAMS}
+
 class FrameAnimation:
+    # Immutable frame sequence shared by everything that plays it; users only keep the tick they started on
+    __slots__ = ('images', 'flipped', 'img_duration', 'loop', 'length')
+    
     def __init__(self, frames, img_dur=5, loop=True):
         self.images = frames
+        # Mirrored frames are built once here rather than per entity
+        self.flipped = [pygame.transform.flip(img, True, False) for img in frames]
         self.loop = loop
         self.img_duration = img_dur
-        self.done = False
-        self.frame = 0
-    
-    def copy(self):
-        return FrameAnimation(self.images, self.img_duration, self.loop)
+        self.length = img_dur * len(frames)
     
-    def update(self):
+    def frame(self, ticks):
+        # Frame index after the animation has been playing for ticks updates
         if self.loop:
-            self.frame = (self.frame + 1) % (self.img_duration * len(self.images))
-        else:
-            self.frame = min(self.frame + 1, self.img_duration * len(self.images) - 1)
-            if self.frame >= self.img_duration * len(self.images) - 1:
-                self.done = True
+            return ticks % self.length // self.img_duration
+        return min(ticks, self.length - 1) // self.img_duration
     
-    def img(self):
-        # Return current frame's image
-        return self.images[int(self.frame / self.img_duration)]
\ No newline at end of file
+    def img(self, ticks, flip=False):
+        # Return the image shown after ticks updates
+        return (self.flipped if flip else self.images)[self.frame(ticks)]
\ No newline at end of file